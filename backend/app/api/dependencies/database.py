@@ -1,18 +1,67 @@
-from typing import Callable, Type
+from typing import Callable, Optional, Type
 
 from databases import Database
 from fastapi import Depends
 from starlette.requests import Request
+from starlette.responses import Response
 
+from ...core.config import READ_YOUR_WRITES_SECONDS
+from ...db.cache import CacheBackend
+from ...db.coalescing import SingleFlight
+from ...db.events import EventNotifier
 from ...db.repositories.base import BaseRepository
 
+READ_YOUR_WRITES_COOKIE = "read_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
 
 def get_database(request: Request) -> Database:
     return request.app.state._db
 
 
+def get_read_database(
+    request: Request, response: Response, db: Database = Depends(get_database)
+) -> Database:
+    """
+    Route reads to the replica, except for write requests and for clients that
+    wrote within the last READ_YOUR_WRITES_SECONDS, which read from the primary.
+    """
+    read_db = request.app.state._read_db
+    if read_db is None:
+        return db
+    if request.method not in SAFE_METHODS:
+        if READ_YOUR_WRITES_SECONDS > 0:
+            response.set_cookie(
+                READ_YOUR_WRITES_COOKIE,
+                "1",
+                max_age=READ_YOUR_WRITES_SECONDS,
+                httponly=True,
+            )
+        return db
+    if READ_YOUR_WRITES_COOKIE in request.cookies:
+        return db
+    return read_db
+
+
+def get_cache(request: Request) -> Optional[CacheBackend]:
+    return request.app.state._cache
+
+
+def get_single_flight(request: Request) -> Optional[SingleFlight]:
+    return request.app.state._single_flight
+
+
+def get_event_notifier(request: Request) -> EventNotifier:
+    return request.app.state._event_notifier
+
+
 def get_repository(repo_type: Type[BaseRepository]) -> Callable:
-    def get_repo(db: Database = Depends(get_database)) -> BaseRepository:
-        return repo_type(db)
+    def get_repo(
+        db: Database = Depends(get_database),
+        read_db: Database = Depends(get_read_database),
+        cache: Optional[CacheBackend] = Depends(get_cache),
+        single_flight: Optional[SingleFlight] = Depends(get_single_flight),
+    ) -> BaseRepository:
+        return repo_type(db, cache=cache, read_db=read_db, single_flight=single_flight)
 
     return get_repo
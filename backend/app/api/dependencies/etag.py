@@ -0,0 +1,74 @@
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Header, HTTPException
+from starlette import status
+from starlette.responses import Response
+
+from ...models.book import BookResponse
+
+
+def version_etag(version: int, fields: Optional[Tuple[str, ...]] = None) -> str:
+    """
+    Strong ETag for a book version. Projections of the same version are
+    different representations, so their ETags also carry the selected fields.
+    """
+    if fields is None:
+        return f'"{version}"'
+    digest = hashlib.sha1(",".join(fields).encode()).hexdigest()[:8]
+    return f'"{version}-{digest}"'
+
+
+def book_etag(book: BookResponse, fields: Optional[Tuple[str, ...]] = None) -> str:
+    if fields is not None and "available" in fields:
+        # Loans change availability without bumping the version.
+        fields = (*fields, f"available={book.available}")
+    return version_etag(book.version, fields)
+
+
+def books_etag(
+    versions: Iterable[Tuple[Any, ...]], fields: Optional[Tuple[str, ...]] = None
+) -> str:
+    """
+    Strong ETag for a page of books, built from their (id, version) pairs, or
+    (id, version, available) when availability is selected.
+    """
+    digest = hashlib.sha1(
+        ",".join(":".join(str(value) for value in item) for item in versions).encode()
+    )
+    if fields is not None:
+        digest.update(b";" + ",".join(fields).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def get_if_match_version(if_match: Optional[str] = Header(None)) -> Optional[int]:
+    """Translate an If-Match header into the book version it expects."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().strip('"'))
+    except ValueError:
+        # Weak or foreign ETags can never match under strong comparison.
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="If-Match does not match the current book version.",
+        )
+
+
+def get_if_none_match(
+    if_none_match: Optional[str] = Header(None),
+) -> Optional[List[str]]:
+    """Split an If-None-Match header into entity tags for weak comparison."""
+    if if_none_match is None:
+        return None
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return [tag[2:] if tag.startswith("W/") else tag for tag in tags if tag]
+
+
+def etag_matches(etag: str, if_none_match: Optional[List[str]]) -> bool:
+    return if_none_match is not None and ("*" in if_none_match or etag in if_none_match)
+
+
+def not_modified(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    headers = {**(headers or {}), "ETag": etag}
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
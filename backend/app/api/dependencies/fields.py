@@ -0,0 +1,37 @@
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Query
+from starlette import status
+
+from ...models.book import BOOK_FIELDS, BookResponse
+
+ALWAYS_SELECTED_FIELDS = ("id", "version")
+
+
+def get_book_fields(
+    fields: Optional[str] = Query(
+        None,
+        description=(
+            "Comma-separated book fields to return. Books are then returned as "
+            "BookPartialResponse, with id, version and only these fields."
+        ),
+    ),
+) -> Optional[Tuple[str, ...]]:
+    """
+    Parse `fields=` into whitelisted book fields in column order. id and version
+    are always included, since ETags and cursors are built from them. Returns
+    None when exactly the fields of BookResponse are selected.
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(BOOK_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}.",
+        )
+    requested.update(ALWAYS_SELECTED_FIELDS)
+    if requested == set(BookResponse.__fields__):
+        return None
+    return tuple(name for name in BOOK_FIELDS if name in requested)
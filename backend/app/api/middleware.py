@@ -0,0 +1,163 @@
+import time
+from typing import Sequence
+
+from brotli_asgi import BrotliMiddleware
+from fastapi import FastAPI
+from starlette import status
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.admission import REQUEST_DEADLINE, AdmissionLane, Overloaded
+from ..core.config import (
+    BROTLI_QUALITY,
+    COMPRESSION,
+    COMPRESSION_MINIMUM_SIZE,
+    GZIP_COMPRESS_LEVEL,
+    RETRY_AFTER_SECONDS,
+)
+from ..core.metrics import HTTP_REQUEST_SECONDS
+
+
+def add_compression_middleware(app: FastAPI) -> None:
+    """
+    Compress responses larger than COMPRESSION_MINIMUM_SIZE. Brotli falls back
+    to gzip for clients that do not accept it. Event streams are never
+    compressed.
+    """
+    if COMPRESSION == "brotli":
+        app.add_middleware(
+            BrotliMiddleware,
+            quality=BROTLI_QUALITY,
+            minimum_size=COMPRESSION_MINIMUM_SIZE,
+        )
+    elif COMPRESSION == "gzip":
+        app.add_middleware(
+            GZipMiddleware,
+            minimum_size=COMPRESSION_MINIMUM_SIZE,
+            compresslevel=GZIP_COMPRESS_LEVEL,
+        )
+    else:
+        return
+    app.add_middleware(UncompressedEventStreamMiddleware)
+
+
+class UncompressedEventStreamMiddleware:
+    """
+    Drops Accept-Encoding from event stream requests. Compressors hold streamed
+    bodies in their buffers, which would delay every event.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and "text/event-stream" in Headers(scope=scope).get(
+            "accept", ""
+        ):
+            scope = dict(scope)
+            scope["headers"] = [
+                (key, value)
+                for key, value in scope["headers"]
+                if key != b"accept-encoding"
+            ]
+        await self.app(scope, receive, send)
+
+
+class MetricsMiddleware:
+    """Records request latency labelled by route template rather than raw path."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = _route_path(scope)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], route, str(status_code)
+            ).observe(time.perf_counter() - start)
+
+
+class AdmissionMiddleware:
+    """
+    Separate concurrency limits and bounded queues for reads and writes. Shed
+    requests get a 503 with Retry-After instead of waiting past their deadline.
+    Paths starting with one of `exempt_paths` bypass admission.
+    """
+
+    read_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        read_limit: int,
+        read_queue: int,
+        write_limit: int,
+        write_queue: int,
+        deadline: float,
+        exempt_paths: Sequence[str] = ("/metrics",),
+    ) -> None:
+        self.app = app
+        self.read_lane = AdmissionLane("read", limit=read_limit, queue_size=read_queue)
+        self.write_lane = AdmissionLane(
+            "write", limit=write_limit, queue_size=write_queue
+        )
+        self.deadline = deadline
+        self.exempt_paths = tuple(exempt_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] in self.read_methods:
+            lane = self.read_lane
+        else:
+            lane = self.write_lane
+        token = REQUEST_DEADLINE.set(time.monotonic() + self.deadline)
+        try:
+            try:
+                await lane.acquire(timeout=self.deadline)
+            except Overloaded as e:
+                await overloaded_response(e)(scope, receive, send)
+                return
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                lane.release()
+        finally:
+            REQUEST_DEADLINE.reset(token)
+
+
+def overloaded_response(error: Overloaded) -> JSONResponse:
+    return JSONResponse(
+        {"detail": str(error)},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+def _route_path(scope: Scope) -> str:
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
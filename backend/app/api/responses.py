@@ -0,0 +1,48 @@
+from typing import Any, AsyncIterable, AsyncIterator
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, StreamingResponse
+
+
+class NDJSONResponse(StreamingResponse):
+    media_type = "application/x-ndjson"
+
+
+class EventStreamResponse(StreamingResponse):
+    media_type = "text/event-stream"
+
+
+class ModelJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson straight from pydantic models. Routes
+    return it directly, so FastAPI does not validate and re-encode models the
+    repositories already built.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_model_fields)
+
+
+def _model_fields(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    raise TypeError
+
+
+async def ndjson_chunks(
+    models: AsyncIterable[BaseModel], chunk_size: int
+) -> AsyncIterator[bytes]:
+    lines = []
+    async for model in models:
+        lines.append(orjson.dumps(model, default=_model_fields))
+        if len(lines) >= chunk_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def sse_message(model: BaseModel, *, id: int, event: str) -> bytes:
+    data = orjson.dumps(model, default=_model_fields)
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (id, event.encode(), data)
@@ -1,5 +1,9 @@
-from app.api.routes import books
+from app.api.routes import admin, analytics, books, events, histories
 from fastapi import APIRouter
 
 api_router = APIRouter()
 api_router.include_router(books.router, prefix="/books", tags=["books"])
+api_router.include_router(histories.router, prefix="/histories", tags=["histories"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
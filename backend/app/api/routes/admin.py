@@ -0,0 +1,26 @@
+from typing import List
+
+from databases import Database
+from fastapi import APIRouter, Depends, HTTPException
+from starlette import status
+
+from ...api.dependencies.database import get_database
+from ...models.slow_query import SlowQuery
+
+router = APIRouter()
+
+
+@router.get(
+    "/slow-queries",
+    response_model=List[SlowQuery],
+    name="admin:get-slow-queries",
+    status_code=status.HTTP_200_OK,
+)
+async def get_slow_queries(db: Database = Depends(get_database)) -> List[SlowQuery]:
+    slow_query_log = getattr(db, "slow_query_log", None)
+    if slow_query_log is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Slow query log is disabled.",
+        )
+    return slow_query_log.entries
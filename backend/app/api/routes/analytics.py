@@ -0,0 +1,64 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette import status
+
+from ...api.dependencies.database import get_repository
+from ...core.config import BOOK_COUNT_CACHE_TTL, MAX_PAGE_SIZE
+from ...db.repositories.analytics import AnalyticsRepository
+from ...db.repositories.books import BookRepository
+from ...models.analytics import BookLoanStats, CategoryMeanLoanDurations, Utilization
+
+router = APIRouter()
+
+
+@router.get(
+    "/most-borrowed",
+    response_model=List[BookLoanStats],
+    name="analytics:most-borrowed",
+    status_code=status.HTTP_200_OK,
+)
+async def get_most_borrowed_books(
+    limit: int = Query(10, ge=1),
+    analytics_repo: AnalyticsRepository = Depends(get_repository(AnalyticsRepository)),
+) -> List[BookLoanStats]:
+    return await analytics_repo.get_most_borrowed_books(limit=min(limit, MAX_PAGE_SIZE))
+
+
+@router.get(
+    "/utilization",
+    response_model=Utilization,
+    name="analytics:utilization",
+    status_code=status.HTTP_200_OK,
+)
+async def get_utilization(
+    analytics_repo: AnalyticsRepository = Depends(get_repository(AnalyticsRepository)),
+    book_repo: BookRepository = Depends(get_repository(BookRepository)),
+) -> Utilization:
+    books = await book_repo.estimate_book_count(cache_ttl=BOOK_COUNT_CACHE_TTL)
+    return await analytics_repo.get_utilization(books=books)
+
+
+@router.get(
+    "/mean-loan-durations",
+    response_model=List[CategoryMeanLoanDurations],
+    name="analytics:mean-loan-durations",
+    status_code=status.HTTP_200_OK,
+)
+async def get_mean_loan_durations(
+    percentiles: List[float] = Query([0.5, 0.9, 0.99]),
+    limit: int = Query(10, ge=1),
+    analytics_repo: AnalyticsRepository = Depends(get_repository(AnalyticsRepository)),
+) -> List[CategoryMeanLoanDurations]:
+    """
+    Percentiles, per category, of the books' mean loan durations. Each book
+    counts once however often it was borrowed.
+    """
+    if not all(0 <= fraction <= 1 for fraction in percentiles):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Percentiles must be between 0 and 1.",
+        )
+    return await analytics_repo.get_category_mean_loan_durations(
+        percentiles=percentiles, limit=min(limit, MAX_PAGE_SIZE)
+    )
@@ -1,14 +1,51 @@
 import datetime
-from typing import List
+import json
+from typing import Any, Dict, List, NoReturn, Optional, Tuple, Union
 
-from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from pydantic import ValidationError
 from starlette import status
 
 from ...api.dependencies.database import get_repository
+from ...api.dependencies.etag import (
+    book_etag,
+    books_etag,
+    etag_matches,
+    get_if_match_version,
+    get_if_none_match,
+    not_modified,
+    version_etag,
+)
+from ...api.dependencies.fields import get_book_fields
+from ...api.dependencies.pagination import CountMode, decode_cursor, encode_cursor
+from ...api.responses import ModelJSONResponse, NDJSONResponse, ndjson_chunks
+from ...core.config import (
+    BOOK_COUNT_CACHE_TTL,
+    BULK_INSERT_BATCH_SIZE,
+    BULK_MAX_BODY_BYTES,
+    BULK_MAX_ITEMS,
+    EXPORT_CHUNK_SIZE,
+    HISTORY_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+)
 from ...db.repositories.books import BookRepository
 from ...db.repositories.histories import HistoryRepository
-from ...models.book import BookResponse, BookCreate, BookUpdate
-from ...models.history import HistoryResponse, BorrowingHistory, ReturningHistory
+from ...models.book import (
+    BookAvailability,
+    BookBulkResponse,
+    BookBulkResult,
+    BookResponse,
+    BookCreate,
+    BookPartialResponse,
+    BookSearchResponse,
+    BookUpdate,
+)
+from ...models.history import (
+    BookLoanResponse,
+    BookLoanResult,
+    BorrowingHistory,
+    HistoryResponse,
+)
 
 router = APIRouter()
 
@@ -27,41 +64,341 @@ async def create_book(
     return created_book
 
 
+@router.post(
+    "/bulk",
+    response_model=BookBulkResponse,
+    name="books:create-books",
+    status_code=status.HTTP_200_OK,
+)
+async def create_books(
+    request: Request,
+    book_repo: BookRepository = Depends(get_repository(BookRepository)),
+) -> BookBulkResponse:
+    results: List[BookBulkResult] = []
+    new_books: List[BookCreate] = []
+    for index, item in enumerate(await _read_bulk_items(request)):
+        try:
+            if isinstance(item, bytes):
+                new_books.append(BookCreate.parse_raw(item))
+            else:
+                new_books.append(BookCreate.parse_obj(item))
+        except ValidationError as e:
+            results.append(BookBulkResult(index=index, error=str(e)))
+        else:
+            results.append(BookBulkResult(index=index))
+
+    created_books = await book_repo.create_books(
+        new_books=new_books, batch_size=BULK_INSERT_BATCH_SIZE
+    )
+    valid_results = [result for result in results if not result.error]
+    rejected: List[Tuple[BookBulkResult, BookCreate]] = []
+    for result, new_book, book in zip(valid_results, new_books, created_books):
+        result.book = book
+        if not book:
+            rejected.append((result, new_book))
+    # ON CONFLICT DO NOTHING does not say which constraint rejected a row.
+    if rejected:
+        conflicts = await book_repo.get_isbn_conflicts(
+            new_books=[new_book for _, new_book in rejected]
+        )
+        for (result, _), columns in zip(rejected, conflicts):
+            columns_text = " and ".join(columns) or "isbn10 or isbn13"
+            result.error = f"A book with that {columns_text} already exists."
+
+    failed = sum(1 for result in results if result.error)
+    return BookBulkResponse(
+        created=len(results) - failed, failed=failed, results=results
+    )
+
+
+@router.post(
+    "/burrow",
+    response_model=BookLoanResponse,
+    name="books:burrow-books",
+    status_code=status.HTTP_200_OK,
+)
+async def burrow_books(
+    book_ids: List[int] = Body(..., embed=True),
+    history_repo: HistoryRepository = Depends(get_repository(HistoryRepository)),
+) -> BookLoanResponse:
+    _check_book_batch(book_ids)
+    histories = await history_repo.borrow_books(
+        book_ids=book_ids, borrowing_date=datetime.datetime.utcnow()
+    )
+    return _loan_response(book_ids, histories, "Cannot burrow this book.")
+
+
+@router.post(
+    "/return",
+    response_model=BookLoanResponse,
+    name="books:return-books",
+    status_code=status.HTTP_200_OK,
+)
+async def return_books(
+    book_ids: List[int] = Body(..., embed=True),
+    history_repo: HistoryRepository = Depends(get_repository(HistoryRepository)),
+) -> BookLoanResponse:
+    _check_book_batch(book_ids)
+    histories = await history_repo.return_books(
+        book_ids=book_ids, returning_date=datetime.datetime.utcnow()
+    )
+    return _loan_response(book_ids, histories, "Cannot return this book.")
+
+
+def _check_book_batch(book_ids: List[int]) -> None:
+    if len(book_ids) > MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {MAX_PAGE_SIZE} books can be handled per request.",
+        )
+
+
+def _loan_response(
+    book_ids: List[int],
+    histories: Dict[int, Optional[HistoryResponse]],
+    unavailable_error: str,
+) -> BookLoanResponse:
+    results = []
+    seen = set()
+    for book_id in book_ids:
+        if book_id not in histories:
+            error = "No book found with that id."
+        elif book_id in seen or histories[book_id] is None:
+            error = unavailable_error
+        else:
+            error = None
+        seen.add(book_id)
+        history = None if error else histories[book_id]
+        results.append(BookLoanResult(book_id=book_id, history=history, error=error))
+
+    failed = sum(1 for result in results if result.error)
+    return BookLoanResponse(
+        succeeded=len(results) - failed, failed=failed, results=results
+    )
+
+
+async def _read_bulk_items(request: Request) -> List[Union[Any, bytes]]:
+    """
+    Return decoded array items, or the raw lines of an NDJSON stream. Bodies
+    over BULK_MAX_BODY_BYTES or BULK_MAX_ITEMS items are rejected with a 413.
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > BULK_MAX_BODY_BYTES:
+        _raise_bulk_too_large()
+    ndjson = request.headers.get("content-type", "").startswith("application/x-ndjson")
+    chunks = []
+    lines = []
+    buffer = b""
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > BULK_MAX_BODY_BYTES:
+            _raise_bulk_too_large()
+        if not ndjson:
+            chunks.append(chunk)
+            continue
+        *complete, buffer = (buffer + chunk).split(b"\n")
+        lines.extend(line for line in complete if line.strip())
+        if len(lines) > BULK_MAX_ITEMS:
+            _raise_bulk_too_large()
+
+    if ndjson:
+        if buffer.strip():
+            lines.append(buffer)
+        items = lines
+    else:
+        try:
+            items = json.loads(b"".join(chunks))
+        except ValueError:
+            items = None
+        if not isinstance(items, list):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Expected a JSON array or NDJSON stream of books.",
+            )
+    if len(items) > BULK_MAX_ITEMS:
+        _raise_bulk_too_large()
+    return items
+
+
+def _raise_bulk_too_large() -> NoReturn:
+    raise HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=(
+            f"At most {BULK_MAX_ITEMS} books and {BULK_MAX_BODY_BYTES} bytes "
+            "can be created per request."
+        ),
+    )
+
+
+@router.get(
+    "/export",
+    response_class=NDJSONResponse,
+    name="books:export-books",
+    status_code=status.HTTP_200_OK,
+)
+async def export_books(
+    after_id: int = Query(0, ge=0),
+    book_repo: BookRepository = Depends(get_repository(BookRepository)),
+) -> NDJSONResponse:
+    return NDJSONResponse(
+        ndjson_chunks(book_repo.iterate_books(after_id=after_id), EXPORT_CHUNK_SIZE)
+    )
+
+
+@router.get(
+    "/search",
+    response_model=BookSearchResponse,
+    name="books:search-books",
+    status_code=status.HTTP_200_OK,
+)
+async def search_books(
+    q: Optional[str] = None,
+    categories: Optional[List[str]] = Query(None),
+    authors: Optional[List[str]] = Query(None),
+    limit: int = Query(10, ge=1),
+    offset: int = Query(0, ge=0),
+    facet_limit: int = Query(10, ge=0, le=100),
+    book_repo: BookRepository = Depends(get_repository(BookRepository)),
+) -> BookSearchResponse:
+    return await book_repo.search_books(
+        q=q,
+        categories=categories,
+        authors=authors,
+        limit=min(limit, MAX_PAGE_SIZE),
+        offset=offset,
+        facet_limit=facet_limit,
+    )
+
+
+@router.get(
+    "/availability",
+    response_model=List[BookAvailability],
+    name="books:get-availability",
+    status_code=status.HTTP_200_OK,
+)
+async def get_books_availability(
+    ids: List[int] = Query(...),
+    history_repo: HistoryRepository = Depends(get_repository(HistoryRepository)),
+) -> List[BookAvailability]:
+    """Tell whether each book is available; unknown ids are left out."""
+    book_ids = list(dict.fromkeys(ids))
+    _check_book_batch(book_ids)
+    return await history_repo.get_books_availability(book_ids=book_ids)
+
+
 @router.get(
     "/{id}",
-    response_model=BookResponse,
+    response_model=Union[BookResponse, BookPartialResponse],
     name="books:get-book-by-id",
     status_code=status.HTTP_200_OK,
 )
 async def get_book_by_id(
-    id: int, book_repo: BookRepository = Depends(get_repository(BookRepository))
-) -> BookResponse:
-    book = await book_repo.get_book_by_id(id=id)
+    id: int,
+    fields: Optional[Tuple[str, ...]] = Depends(get_book_fields),
+    if_none_match: Optional[List[str]] = Depends(get_if_none_match),
+    book_repo: BookRepository = Depends(get_repository(BookRepository)),
+) -> Union[BookResponse, Response]:
+    # Availability is not covered by the version, so those ETags need the book.
+    if if_none_match is not None and "available" not in (fields or ()):
+        version = await book_repo.get_book_version(id=id)
+        if version is not None:
+            etag = version_etag(version, fields)
+            if etag_matches(etag, if_none_match):
+                return not_modified(etag)
+    book = await book_repo.get_book_by_id(id=id, fields=fields)
     if not book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No book found with that id."
         )
-    return book
+    etag = book_etag(book, fields)
+    if etag_matches(etag, if_none_match):
+        return not_modified(etag)
+    return ModelJSONResponse(book, headers={"ETag": etag})
 
 
 @router.get(
     "/",
-    response_model=List[BookResponse],
+    response_model=List[Union[BookResponse, BookPartialResponse]],
     name="books:get-books",
     status_code=status.HTTP_200_OK,
 )
 async def get_books(
-    limit: int = 10,
-    offset: int = 0,
+    limit: int = Query(10, ge=1),
+    offset: int = Query(0, ge=0),
+    after: Optional[str] = None,
+    count: CountMode = Query(CountMode.estimated),
+    fields: Optional[Tuple[str, ...]] = Depends(get_book_fields),
+    available: Optional[bool] = None,
+    if_none_match: Optional[List[str]] = Depends(get_if_none_match),
     book_repo: BookRepository = Depends(get_repository(BookRepository)),
-) -> List[BookResponse]:
-    books = await book_repo.get_books(limit=limit, offset=offset)
+) -> Union[List[BookResponse], Response]:
+    """
+    List books by id, with only `fields` when given and only available or
+    borrowed books when `available` is given. X-Has-More tells whether another
+    page follows, and X-Total-Count carries the exact or estimated total of
+    unfiltered listings unless `count=none`.
+    """
+    limit = min(limit, MAX_PAGE_SIZE)
+    after_id = decode_cursor(after, id=int)["id"] if after else None
+    if available is not None:
+        count = CountMode.none
+    with_availability = "available" in (fields or ())
+    # Versions alone cannot tell whether loans changed the page.
+    if if_none_match is not None and available is None and not with_availability:
+        # One extra row tells whether another page follows.
+        versions = await book_repo.get_book_versions(
+            limit=limit + 1, offset=offset, after_id=after_id
+        )
+        page = versions[:limit]
+        etag = books_etag(page, fields)
+        if page and etag_matches(etag, if_none_match):
+            headers = await _pagination_headers(
+                book_repo, count, page[-1][0] if len(versions) > limit else None
+            )
+            return not_modified(etag, headers)
+    books = await book_repo.get_books(
+        limit=limit + 1,
+        offset=offset,
+        after_id=after_id,
+        fields=fields,
+        available=available,
+    )
     if not books:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No books found,",
         )
-    return books
+    has_more = len(books) > limit
+    books = books[:limit]
+    headers = await _pagination_headers(
+        book_repo, count, books[-1].id if has_more else None
+    )
+    if with_availability:
+        etag = books_etag(
+            ((book.id, book.version, book.available) for book in books), fields
+        )
+    else:
+        etag = books_etag(((book.id, book.version) for book in books), fields)
+    if etag_matches(etag, if_none_match):
+        return not_modified(etag, headers)
+    headers["ETag"] = etag
+    return ModelJSONResponse(books, headers=headers)
+
+
+async def _pagination_headers(
+    book_repo: BookRepository, count: CountMode, next_after_id: Optional[int]
+) -> Dict[str, str]:
+    headers = {"X-Has-More": "true" if next_after_id is not None else "false"}
+    if next_after_id is not None:
+        headers["X-Next-Cursor"] = encode_cursor(id=next_after_id)
+    if count is CountMode.exact:
+        total = await book_repo.count_books(cache_ttl=BOOK_COUNT_CACHE_TTL)
+        headers["X-Total-Count"] = str(total)
+    elif count is CountMode.estimated:
+        total = await book_repo.estimate_book_count(cache_ttl=BOOK_COUNT_CACHE_TTL)
+        headers["X-Total-Count"] = str(total)
+    return headers
 
 
 @router.patch(
@@ -72,14 +409,24 @@ async def get_books(
 )
 async def update_book(
     id: int,
+    response: Response,
     update_data: BookUpdate = Body(..., embed=True),
+    version: Optional[int] = Depends(get_if_match_version),
     book_repo: BookRepository = Depends(get_repository(BookRepository)),
 ) -> BookResponse:
-    updated_book = await book_repo.update_book(id=id, update_data=update_data)
+    updated_book = await book_repo.update_book(
+        id=id, update_data=update_data, version=version
+    )
     if not updated_book:
+        if version is not None and await book_repo.get_book_by_id(id=id):
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="If-Match does not match the current book version.",
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No book found with that id."
         )
+    response.headers["ETag"] = book_etag(updated_book)
     return updated_book
 
 
@@ -111,22 +458,21 @@ async def burrow_book(
     book_repo: BookRepository = Depends(get_repository(BookRepository)),
     history_repo: HistoryRepository = Depends(get_repository(HistoryRepository)),
 ) -> HistoryResponse:
+    borrowing_history = BorrowingHistory(
+        book_id=id, borrowing_date=datetime.datetime.utcnow()
+    )
+    history = await history_repo.borrow_book(borrowing_history=borrowing_history)
+    if history:
+        return history
+
     book = await book_repo.get_book_by_id(id=id)
     if not book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No book found with that id."
         )
-
-    latest_history = await history_repo.get_book_latest_history(book_id=id)
-    if latest_history and not latest_history.returning_date:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Cannot burrow this book."
-        )
-
-    borrowing_history = BorrowingHistory(
-        book_id=id, borrowing_date=datetime.datetime.utcnow()
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN, detail="Cannot burrow this book."
     )
-    return await history_repo.borrow_book(borrowing_history=borrowing_history)
 
 
 @router.post(
@@ -140,25 +486,20 @@ async def return_book(
     book_repo: BookRepository = Depends(get_repository(BookRepository)),
     history_repo: HistoryRepository = Depends(get_repository(HistoryRepository)),
 ) -> HistoryResponse:
+    history = await history_repo.return_book(
+        book_id=id, returning_date=datetime.datetime.utcnow()
+    )
+    if history:
+        return history
+
     book = await book_repo.get_book_by_id(id=id)
     if not book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No book found with that id."
         )
-
-    latest_history = await history_repo.get_book_latest_history(book_id=id)
-    if not latest_history or latest_history.returning_date:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Cannot return this book."
-        )
-    history = latest_history.dict()
-    returning_history = ReturningHistory(
-        id=history["id"],
-        book_id=history["book_id"],
-        borrowing_date=history["borrowing_date"],
-        returning_date=datetime.datetime.utcnow(),
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN, detail="Cannot return this book."
     )
-    return await history_repo.return_book(returning_history=returning_history)
 
 
 @router.get(
@@ -169,12 +510,43 @@ async def return_book(
 )
 async def get_burrow_history(
     id: int,
+    response: Response,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1),
+    after: Optional[str] = None,
+    borrowed_from: Optional[datetime.datetime] = None,
+    borrowed_to: Optional[datetime.datetime] = None,
     history_repo: HistoryRepository = Depends(get_repository(HistoryRepository)),
 ) -> List[HistoryResponse]:
-    histories = await history_repo.get_borrow_history(book_id=id)
+    limit = min(limit, MAX_PAGE_SIZE)
+    before = None
+    if after:
+        cursor = decode_cursor(after, borrowing_date=str, id=int)
+        try:
+            before = (
+                datetime.datetime.fromisoformat(cursor["borrowing_date"]),
+                cursor["id"],
+            )
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+            )
+    # One extra row tells whether another page follows.
+    histories = await history_repo.get_borrow_history(
+        book_id=id,
+        limit=limit + 1,
+        before=before,
+        borrowed_from=borrowed_from,
+        borrowed_to=borrowed_to,
+    )
     if not histories:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No book's burrow history found,",
         )
+    if len(histories) > limit:
+        histories = histories[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            borrowing_date=histories[-1].borrowing_date.isoformat(),
+            id=histories[-1].id,
+        )
     return histories
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import AsyncIterator, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from starlette import status
+
+from ...api.dependencies.database import get_event_notifier, get_repository
+from ...api.responses import EventStreamResponse, sse_message
+from ...core.config import EVENT_POLL_SECONDS, EVENT_WAIT_SECONDS, MAX_PAGE_SIZE
+from ...db.events import EventNotifier
+from ...db.repositories.events import EventRepository
+from ...models.event import BookEvent, BookEventPage
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    response_model=BookEventPage,
+    name="events:get-events",
+    status_code=status.HTTP_200_OK,
+)
+async def get_events(
+    after: int = Query(0, ge=0),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1),
+    wait: float = Query(EVENT_WAIT_SECONDS, ge=0),
+    event_repo: EventRepository = Depends(get_repository(EventRepository)),
+    notifier: EventNotifier = Depends(get_event_notifier),
+) -> BookEventPage:
+    """
+    Long-poll for book events after seq `after`, waiting up to `wait` seconds
+    when there are none yet. Resume from the returned `last_seq`.
+    """
+    deadline = time.monotonic() + min(wait, EVENT_WAIT_SECONDS)
+    while True:
+        waiter = notifier.waiter()
+        events = await _get_events(event_repo, after, min(limit, MAX_PAGE_SIZE))
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            break
+        await notifier.wait(waiter, min(remaining, EVENT_POLL_SECONDS))
+    return BookEventPage(events=events, last_seq=events[-1].seq if events else after)
+
+
+@router.get(
+    "/stream",
+    response_class=EventStreamResponse,
+    name="events:stream-events",
+    status_code=status.HTTP_200_OK,
+)
+async def stream_events(
+    after: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[int] = Header(None, ge=0),
+    event_repo: EventRepository = Depends(get_repository(EventRepository)),
+    notifier: EventNotifier = Depends(get_event_notifier),
+) -> EventStreamResponse:
+    """
+    Stream book events as server-sent events with the seq as event id, so
+    reconnecting clients resume through Last-Event-ID.
+    """
+    after_seq = last_event_id if last_event_id is not None else after or 0
+    waiter = notifier.waiter()
+    events = await _get_events(event_repo, after_seq, MAX_PAGE_SIZE)
+    return EventStreamResponse(
+        _event_stream(event_repo, notifier, after_seq, waiter, events),
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+async def _get_events(
+    event_repo: EventRepository, after_seq: int, limit: int
+) -> List[BookEvent]:
+    events = await event_repo.get_events(after_seq=after_seq, limit=limit)
+    if events is None:
+        compacted_seq = await event_repo.get_compacted_seq()
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Events were compacted, re-scan the books and resume from "
+            "X-Compacted-Seq.",
+            headers={"X-Compacted-Seq": str(compacted_seq)},
+        )
+    return events
+
+
+async def _event_stream(
+    event_repo: EventRepository,
+    notifier: EventNotifier,
+    after_seq: int,
+    waiter: asyncio.Event,
+    events: List[BookEvent],
+) -> AsyncIterator[bytes]:
+    while True:
+        for event in events:
+            yield sse_message(event, id=event.seq, event=event.type)
+        if events:
+            after_seq = events[-1].seq
+        if len(events) < MAX_PAGE_SIZE:
+            await notifier.wait(waiter, EVENT_POLL_SECONDS)
+            if not waiter.is_set():
+                # Keeps idle connections open through proxies.
+                yield b": keepalive\n\n"
+        waiter = notifier.waiter()
+        events = await event_repo.get_events(after_seq=after_seq, limit=MAX_PAGE_SIZE)
+        if events is None:
+            yield b"event: compacted\ndata: {}\n\n"
+            return
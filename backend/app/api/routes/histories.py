@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from starlette import status
+
+from ...api.dependencies.database import get_repository
+from ...api.responses import NDJSONResponse, ndjson_chunks
+from ...core.config import EXPORT_CHUNK_SIZE
+from ...db.repositories.histories import HistoryRepository
+
+router = APIRouter()
+
+
+@router.get(
+    "/export",
+    response_class=NDJSONResponse,
+    name="histories:export-histories",
+    status_code=status.HTTP_200_OK,
+)
+async def export_histories(
+    after_id: int = Query(0, ge=0),
+    history_repo: HistoryRepository = Depends(get_repository(HistoryRepository)),
+) -> NDJSONResponse:
+    return NDJSONResponse(
+        ndjson_chunks(
+            history_repo.iterate_histories(after_id=after_id), EXPORT_CHUNK_SIZE
+        )
+    )
@@ -0,0 +1,34 @@
+from typing import Iterator
+
+from fastapi import APIRouter
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import CollectorRegistry, CounterMetricFamily, Metric
+from starlette.requests import Request
+from starlette.responses import Response
+
+router = APIRouter()
+
+
+class AppStateCollector:
+    """Exposes counters kept on the application's state objects."""
+
+    def __init__(self, app_state) -> None:
+        self.app_state = app_state
+
+    def collect(self) -> Iterator[Metric]:
+        cache = getattr(self.app_state, "_cache", None)
+        if cache is not None:
+            for name, value in cache.stats.dict().items():
+                yield CounterMetricFamily(
+                    f"book_cache_{name}", f"Book cache {name}.", value=value
+                )
+
+
+@router.get("/metrics", name="metrics:get-metrics", include_in_schema=False)
+async def get_metrics(request: Request) -> Response:
+    app_registry = CollectorRegistry(auto_describe=False)
+    app_registry.register(AppStateCollector(request.app.state))
+    return Response(
+        generate_latest(REGISTRY) + generate_latest(app_registry),
+        media_type=CONTENT_TYPE_LATEST,
+    )
@@ -1,8 +1,33 @@
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
-from ..api.routes import api_router
+from ..api.middleware import (
+    AdmissionMiddleware,
+    MetricsMiddleware,
+    add_compression_middleware,
+    overloaded_response,
+)
+from ..api.routes import api_router, metrics
 from ..core import config, tasks
+from ..core.admission import Overloaded
+
+# Response headers browsers only let cross-origin callers read when exposed.
+EXPOSED_HEADERS = [
+    "ETag",
+    "Retry-After",
+    "X-Compacted-Seq",
+    "X-Has-More",
+    "X-Next-Cursor",
+    "X-Total-Count",
+]
+
+
+async def overloaded_exception_handler(
+    request: Request, error: Overloaded
+) -> JSONResponse:
+    return overloaded_response(error)
 
 
 def get_application():
@@ -14,12 +39,28 @@ def get_application():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=EXPOSED_HEADERS,
     )
+    add_compression_middleware(app)
+    if config.ADMISSION_CONTROL:
+        app.add_middleware(
+            AdmissionMiddleware,
+            read_limit=config.ADMISSION_READ_LIMIT,
+            read_queue=config.ADMISSION_READ_QUEUE,
+            write_limit=config.ADMISSION_WRITE_LIMIT,
+            write_queue=config.ADMISSION_WRITE_QUEUE,
+            deadline=config.REQUEST_DEADLINE_SECONDS,
+            # Long-lived event consumers must not hold admission slots.
+            exempt_paths=("/metrics", f"{config.API_PREFIX}/events"),
+        )
+    app.add_middleware(MetricsMiddleware)
+    app.add_exception_handler(Overloaded, overloaded_exception_handler)
 
     app.add_event_handler("startup", tasks.create_start_app_handler(app))
     app.add_event_handler("shutdown", tasks.create_stop_app_handler(app))
 
     app.include_router(api_router, prefix=config.API_PREFIX)
+    app.include_router(metrics.router)
 
     return app
 
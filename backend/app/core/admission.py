@@ -0,0 +1,85 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from .metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS, ADMISSION_WAIT_SECONDS
+
+# Monotonic time by which the current request must have finished waiting for
+# admission and database connections.
+REQUEST_DEADLINE: ContextVar[Optional[float]] = ContextVar(
+    "request_deadline", default=None
+)
+
+# Seconds a database checkout may wait even after the request deadline passed.
+MIN_CHECKOUT_TIMEOUT = 0.1
+
+
+class Overloaded(Exception):
+    """The request was shed instead of waiting past its deadline."""
+
+
+def remaining_time() -> Optional[float]:
+    deadline = REQUEST_DEADLINE.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def checkout_timeout(timeout: Optional[float]) -> Optional[float]:
+    """
+    How long a database checkout may wait: `timeout` from the start of the
+    checkout, cut short by the request deadline, but never below
+    MIN_CHECKOUT_TIMEOUT so an idle pool still serves requests that have run
+    past their deadline.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    remaining = max(remaining, MIN_CHECKOUT_TIMEOUT)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+class AdmissionLane:
+    """
+    Admit at most `limit` concurrent requests and queue at most `queue_size`
+    more. Requests that find the queue full, or are not admitted before their
+    deadline, raise Overloaded.
+    """
+
+    def __init__(self, name: str, *, limit: int, queue_size: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.waiting = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def acquire(self, timeout: Optional[float]) -> None:
+        # Created on first use so the semaphore binds to the serving event loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return
+        if self.waiting >= self.queue_size:
+            ADMISSION_REJECTIONS.labels(self.name, "queue_full").inc()
+            raise Overloaded("Too many requests are waiting.")
+
+        self.waiting += 1
+        ADMISSION_QUEUE_DEPTH.labels(self.name).inc()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            ADMISSION_REJECTIONS.labels(self.name, "deadline").inc()
+            raise Overloaded("Request deadline passed while queued.")
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUE_DEPTH.labels(self.name).dec()
+            ADMISSION_WAIT_SECONDS.labels(self.name).observe(
+                time.perf_counter() - start
+            )
+
+    def release(self) -> None:
+        if self._semaphore is not None:
+            self._semaphore.release()
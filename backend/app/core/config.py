@@ -1,6 +1,6 @@
 from databases import DatabaseURL
 from starlette.config import Config
-from starlette.datastructures import Secret
+from starlette.datastructures import CommaSeparatedStrings, Secret
 
 config = Config(".env")
 
@@ -19,3 +19,89 @@ DATABASE_URL = config(
     cast=DatabaseURL,
     default=f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}",
 )
+
+# Unix time the container started, exported by docker-compose, so startup can
+# be reported from container start rather than from process start.
+CONTAINER_STARTED_AT = config("CONTAINER_STARTED_AT", cast=float, default=None)
+
+DB_POOL_MIN_SIZE = config("DB_POOL_MIN_SIZE", cast=int, default=2)
+DB_POOL_MAX_SIZE = config("DB_POOL_MAX_SIZE", cast=int, default=10)
+DB_POOL_MAX_INACTIVE_LIFETIME = config(
+    "DB_POOL_MAX_INACTIVE_LIFETIME", cast=float, default=300.0
+)
+# Seconds a pool checkout may wait, counted from the start of the checkout.
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", cast=float, default=5.0)
+
+# Optional streaming replica that serves read-only repository queries. Reads
+# fall back to the primary while the replica is unreachable, and clients that
+# just wrote are pinned to the primary for READ_YOUR_WRITES_SECONDS.
+DATABASE_REPLICA_URL = config("DATABASE_REPLICA_URL", cast=str, default="")
+REPLICA_RETRY_SECONDS = config("REPLICA_RETRY_SECONDS", cast=float, default=5.0)
+READ_YOUR_WRITES_SECONDS = config("READ_YOUR_WRITES_SECONDS", cast=int, default=5)
+
+# Admission control: reads (GET/HEAD/OPTIONS) and writes each get a concurrency
+# limit and a bounded queue. Requests still queued after
+# REQUEST_DEADLINE_SECONDS get a 503, as do database checkouts that wait past
+# DB_POOL_TIMEOUT or the deadline. Checkouts that start after the deadline
+# still get a short wait of their own.
+ADMISSION_CONTROL = config("ADMISSION_CONTROL", cast=bool, default=True)
+ADMISSION_READ_LIMIT = config("ADMISSION_READ_LIMIT", cast=int, default=40)
+ADMISSION_READ_QUEUE = config("ADMISSION_READ_QUEUE", cast=int, default=100)
+ADMISSION_WRITE_LIMIT = config("ADMISSION_WRITE_LIMIT", cast=int, default=10)
+ADMISSION_WRITE_QUEUE = config("ADMISSION_WRITE_QUEUE", cast=int, default=50)
+REQUEST_DEADLINE_SECONDS = config("REQUEST_DEADLINE_SECONDS", cast=float, default=5.0)
+RETRY_AFTER_SECONDS = config("RETRY_AFTER_SECONDS", cast=int, default=1)
+
+# "gzip", "brotli" or "none".
+COMPRESSION = config("COMPRESSION", cast=str, default="gzip")
+COMPRESSION_MINIMUM_SIZE = config("COMPRESSION_MINIMUM_SIZE", cast=int, default=1000)
+GZIP_COMPRESS_LEVEL = config("GZIP_COMPRESS_LEVEL", cast=int, default=6)
+BROTLI_QUALITY = config("BROTLI_QUALITY", cast=int, default=4)
+
+MAX_PAGE_SIZE = config("MAX_PAGE_SIZE", cast=int, default=100)
+
+BOOK_CACHE_MAX_SIZE = config("BOOK_CACHE_MAX_SIZE", cast=int, default=1024)
+BOOK_CACHE_TTL = config("BOOK_CACHE_TTL", cast=float, default=60.0)
+# Exact book counts are cached briefly so listings rarely run COUNT(*).
+BOOK_COUNT_CACHE_TTL = config("BOOK_COUNT_CACHE_TTL", cast=float, default=5.0)
+
+# Repository methods whose concurrent identical calls share one database call.
+COALESCE_METHODS = config(
+    "COALESCE_METHODS",
+    cast=CommaSeparatedStrings,
+    default=(
+        "BookRepository.get_book_by_id,BookRepository.get_book_version,"
+        "BookRepository.count_books"
+    ),
+)
+
+BULK_INSERT_BATCH_SIZE = config("BULK_INSERT_BATCH_SIZE", cast=int, default=1000)
+# Bulk creates are read whole before inserting, so larger requests get a 413.
+BULK_MAX_ITEMS = config("BULK_MAX_ITEMS", cast=int, default=10000)
+BULK_MAX_BODY_BYTES = config("BULK_MAX_BODY_BYTES", cast=int, default=16 * 1024 * 1024)
+
+EXPORT_CHUNK_SIZE = config("EXPORT_CHUNK_SIZE", cast=int, default=500)
+
+HISTORY_PAGE_SIZE = config("HISTORY_PAGE_SIZE", cast=int, default=50)
+
+# Book change feed: long-poll and SSE consumers wait up to EVENT_WAIT_SECONDS
+# for new events, re-checking every EVENT_POLL_SECONDS when no notification
+# arrives. Events older than EVENT_RETENTION_SECONDS are compacted every
+# EVENT_COMPACTION_INTERVAL_SECONDS.
+EVENT_WAIT_SECONDS = config("EVENT_WAIT_SECONDS", cast=float, default=25.0)
+EVENT_POLL_SECONDS = config("EVENT_POLL_SECONDS", cast=float, default=5.0)
+EVENT_RETENTION_SECONDS = config(
+    "EVENT_RETENTION_SECONDS", cast=float, default=7 * 24 * 3600.0
+)
+EVENT_COMPACTION_INTERVAL_SECONDS = config(
+    "EVENT_COMPACTION_INTERVAL_SECONDS", cast=float, default=3600.0
+)
+
+SLOW_QUERY_THRESHOLD_MS = config("SLOW_QUERY_THRESHOLD_MS", cast=float, default=0)
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = config(
+    "SLOW_QUERY_EXPLAIN_SAMPLE_RATE", cast=float, default=1.0
+)
+SLOW_QUERY_EXPLAINS_PER_MINUTE = config(
+    "SLOW_QUERY_EXPLAINS_PER_MINUTE", cast=int, default=6
+)
+SLOW_QUERY_LOG_SIZE = config("SLOW_QUERY_LOG_SIZE", cast=int, default=100)
@@ -0,0 +1,49 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+APP_STARTUP_SECONDS = Gauge(
+    "app_startup_seconds", "Time from container start to ready to serve."
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Database query latency.", ["query"]
+)
+DB_QUERY_ROWS = Histogram(
+    "db_query_rows",
+    "Rows returned per database query.",
+    ["query"],
+    buckets=(0, 1, 10, 100, 1000, 10000, float("inf")),
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting to check out a pooled connection."
+)
+DB_CONNECTIONS_IN_USE = Gauge(
+    "db_connections_in_use", "Pooled connections currently checked out."
+)
+DB_REPLICA_FALLBACKS = Counter(
+    "db_replica_fallbacks", "Replica reads that were retried on the primary."
+)
+REPOSITORY_SINGLE_FLIGHT_CALLS = Counter(
+    "repository_single_flight_calls",
+    "Coalescable repository calls that ran against the database.",
+    ["method"],
+)
+REPOSITORY_COALESCED_CALLS = Counter(
+    "repository_coalesced_calls",
+    "Repository calls that shared the result of an identical in-flight call.",
+    ["method"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth", "Requests waiting for admission.", ["lane"]
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_wait_seconds", "Time queued requests waited for admission.", ["lane"]
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections",
+    "Requests shed with a 503 instead of waiting.",
+    ["lane", "reason"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ["method", "route", "status_code"],
+)
@@ -1,18 +1,59 @@
+import asyncio
+import logging
+import time
 from typing import Callable
 
+from app.core.config import (
+    BOOK_CACHE_MAX_SIZE,
+    BOOK_CACHE_TTL,
+    COALESCE_METHODS,
+    CONTAINER_STARTED_AT,
+    EVENT_COMPACTION_INTERVAL_SECONDS,
+    EVENT_RETENTION_SECONDS,
+)
+from app.core.metrics import APP_STARTUP_SECONDS
+from app.db.cache import LRUCache
+from app.db.coalescing import SingleFlight
+from app.db.events import compact_events_periodically
 from app.db.tasks import connect_to_db, close_db_connection
 from fastapi import FastAPI
 
+# Report readiness next to uvicorn's own startup messages.
+logger = logging.getLogger("uvicorn.error")
+
+# Fallback start time when the container start time is not provided.
+PROCESS_STARTED_AT = time.time()
+
 
 def create_start_app_handler(app: FastAPI) -> Callable:
     async def start_app() -> None:
+        app.state._cache = (
+            LRUCache(max_size=BOOK_CACHE_MAX_SIZE, ttl=BOOK_CACHE_TTL)
+            if BOOK_CACHE_MAX_SIZE > 0
+            else None
+        )
+        app.state._single_flight = SingleFlight(methods=COALESCE_METHODS)
         await connect_to_db(app)
+        app.state._event_compaction = None
+        if EVENT_COMPACTION_INTERVAL_SECONDS > 0 and hasattr(app.state, "_db"):
+            app.state._event_compaction = asyncio.ensure_future(
+                compact_events_periodically(
+                    app.state._db,
+                    interval=EVENT_COMPACTION_INTERVAL_SECONDS,
+                    retention_seconds=EVENT_RETENTION_SECONDS,
+                )
+            )
+        startup_seconds = time.time() - (CONTAINER_STARTED_AT or PROCESS_STARTED_AT)
+        APP_STARTUP_SECONDS.set(startup_seconds)
+        logger.info("Ready to serve %.2fs after start", startup_seconds)
 
     return start_app
 
 
 def create_stop_app_handler(app: FastAPI) -> Callable:
     async def stop_app() -> None:
+        if app.state._event_compaction is not None:
+            app.state._event_compaction.cancel()
         await close_db_connection(app)
 
     return stop_app
@@ -0,0 +1,58 @@
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Collection, Dict, Hashable, TypeVar
+
+from ..core.metrics import REPOSITORY_COALESCED_CALLS, REPOSITORY_SINGLE_FLIGHT_CALLS
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Share one in-flight call between concurrent callers with the same key.
+    Only the methods named in `methods` (e.g. "BookRepository.get_book_by_id")
+    are coalesced.
+    """
+
+    def __init__(self, *, methods: Collection[str]) -> None:
+        self.methods = frozenset(methods)
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    async def do(
+        self, method: str, key: Hashable, call: Callable[[], Awaitable[T]]
+    ) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            # The call runs in its own task so one caller being cancelled does
+            # not cancel it for the others.
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            REPOSITORY_SINGLE_FLIGHT_CALLS.labels(method).inc()
+        else:
+            REPOSITORY_COALESCED_CALLS.labels(method).inc()
+        return await asyncio.shield(task)
+
+
+def coalesce(method: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Coalesce concurrent identical calls of a keyword-only repository method."""
+    name = method.__qualname__
+
+    @functools.wraps(method)
+    async def wrapper(self: Any, **kwargs: Any) -> T:
+        single_flight = self.single_flight
+        if single_flight is None or name not in single_flight.methods:
+            return await method(self, **kwargs)
+        # Reads pinned to the primary must not share a replica result.
+        key = (name, id(self.read_db), _freeze(kwargs))
+        return await single_flight.do(name, key, lambda: method(self, **kwargs))
+
+    return wrapper
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
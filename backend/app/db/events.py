@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from typing import Optional
+
+import asyncpg
+from databases import Database
+
+from .repositories.events import EventRepository
+
+logger = logging.getLogger(__name__)
+
+BOOK_EVENTS_CHANNEL = "book_events"
+
+
+class EventNotifier:
+    """
+    Wakes event consumers when a transaction that appended book events commits,
+    using a dedicated LISTEN connection. Consumers also poll on a timeout, so a
+    lost listener connection only delays delivery.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self._connection: Optional[asyncpg.Connection] = None
+        self._changed = asyncio.Event()
+
+    async def start(self) -> None:
+        try:
+            self._connection = await asyncpg.connect(self.url)
+            await self._connection.add_listener(BOOK_EVENTS_CHANNEL, self._notify)
+        except Exception as e:
+            logger.warning("Listening for book events failed, polling instead: %s", e)
+            self._connection = None
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    def waiter(self) -> asyncio.Event:
+        """
+        Return the event the next notification sets. Take it before reading
+        events, so a commit landing in between is not missed.
+        """
+        return self._changed
+
+    async def wait(self, waiter: asyncio.Event, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _notify(self, connection, pid, channel, payload) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+async def compact_events_periodically(
+    db: Database, *, interval: float, retention_seconds: float
+) -> None:
+    event_repo = EventRepository(db)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            count = await event_repo.compact_events(retention_seconds=retention_seconds)
+        except Exception as e:
+            logger.warning("Compacting book events failed: %s", e)
+        else:
+            logger.info("Compacted %d book events", count)
@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import sys
+import time
+from types import CodeType, FrameType
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional
+
+import asyncpg
+from databases import Database
+from databases.interfaces import ConnectionBackend, DatabaseBackend
+
+from ..core.admission import Overloaded, checkout_timeout
+from ..core.metrics import (
+    ADMISSION_REJECTIONS,
+    DB_CONNECTIONS_IN_USE,
+    DB_POOL_WAIT_SECONDS,
+    DB_QUERY_ROWS,
+    DB_QUERY_SECONDS,
+    DB_REPLICA_FALLBACKS,
+)
+from .prepared import PreparedQuery
+from .slow_queries import SlowQueryLog
+
+logger = logging.getLogger(__name__)
+
+_query_names: Dict[str, str] = {}
+_caller_names: Dict[CodeType, str] = {}
+
+
+def query_name(query: Any, frame: FrameType) -> str:
+    """
+    Name a query after the *_QUERY constant it came from, looked up in the
+    calling module. Queries built at runtime are named after their caller.
+    """
+    name = _query_names.get(query)
+    if name:
+        return name
+    for key, value in frame.f_globals.items():
+        if key.endswith("_QUERY") and value is query:
+            _query_names[query] = key
+            return key
+    return caller_name(frame)
+
+
+def calling_frame() -> FrameType:
+    """Return the frame that called into the database, skipping this module."""
+    frame = sys._getframe(1)
+    while frame.f_globals is globals():
+        frame = frame.f_back
+    return frame
+
+
+def caller_name(frame: FrameType) -> str:
+    name = _caller_names.get(frame.f_code)
+    if name is None:
+        owner = frame.f_locals.get("self")
+        name = frame.f_code.co_name
+        if owner is not None:
+            name = f"{type(owner).__name__}.{name}"
+        _caller_names[frame.f_code] = name
+    return name
+
+
+class InstrumentedDatabase(Database):
+    """Database that records per-query latency, row counts and pool usage."""
+
+    def __init__(
+        self,
+        url: Any,
+        *,
+        slow_query_log: Optional[SlowQueryLog] = None,
+        pool_timeout: Optional[float] = None,
+        **options: Any,
+    ) -> None:
+        super().__init__(url, **options)
+        self._backend = _InstrumentedBackend(self._backend, pool_timeout)
+        self.slow_query_log = slow_query_log
+
+    async def disconnect(self) -> None:
+        if self.slow_query_log is not None:
+            self.slow_query_log.cancel_pending()
+        await super().disconnect()
+
+    async def fetch_all(self, query: Any, values: dict = None) -> List[Mapping]:
+        frame = calling_frame()
+        start = time.perf_counter()
+        rows = []
+        try:
+            if isinstance(query, PreparedQuery):
+                rows = await self._run_prepared("fetch", query, values)
+            else:
+                rows = await super().fetch_all(query, values)
+            return rows
+        finally:
+            self._observe(frame, query, values, start, len(rows))
+
+    async def fetch_one(self, query: Any, values: dict = None) -> Optional[Mapping]:
+        frame = calling_frame()
+        start = time.perf_counter()
+        row = None
+        try:
+            if isinstance(query, PreparedQuery):
+                row = await self._run_prepared("fetchrow", query, values)
+            else:
+                row = await super().fetch_one(query, values)
+            return row
+        finally:
+            self._observe(frame, query, values, start, 0 if row is None else 1)
+
+    async def fetch_val(self, query: Any, values: dict = None, column: Any = 0) -> Any:
+        frame = calling_frame()
+        start = time.perf_counter()
+        try:
+            if isinstance(query, PreparedQuery):
+                return await self._run_prepared(
+                    "fetchval", query, values, column=column
+                )
+            return await super().fetch_val(query, values, column=column)
+        finally:
+            self._observe(frame, query, values, start, 1)
+
+    async def execute(self, query: Any, values: dict = None) -> Any:
+        frame = calling_frame()
+        start = time.perf_counter()
+        try:
+            return await super().execute(query, values)
+        finally:
+            self._observe(frame, query, values, start, 0)
+
+    async def _run_prepared(
+        self, method: str, query: PreparedQuery, values: Optional[dict], **kwargs: Any
+    ) -> Any:
+        """Run a PreparedQuery on the raw asyncpg connection, skipping SQLAlchemy."""
+        async with self.connection() as connection:
+            # Hold the lock `databases` takes around every query, since tasks
+            # sharing a connection context would otherwise overlap on it.
+            async with connection._query_lock:
+                run = getattr(connection.raw_connection, method)
+                return await run(query.sql, *query.arguments(values), **kwargs)
+
+    def iterate(self, query: Any, values: dict = None) -> AsyncIterator[Mapping]:
+        return self._iterate(query_name(query, calling_frame()), query, values)
+
+    async def _iterate(
+        self, name: str, query: Any, values: Optional[dict]
+    ) -> AsyncIterator[Mapping]:
+        start = time.perf_counter()
+        rows = 0
+        try:
+            async for row in super().iterate(query, values):
+                rows += 1
+                yield row
+        finally:
+            # Streams are paced by their consumer, so they are timed but never
+            # reported as slow queries.
+            DB_QUERY_SECONDS.labels(name).observe(time.perf_counter() - start)
+            DB_QUERY_ROWS.labels(name).observe(rows)
+
+    def _observe(
+        self,
+        frame: FrameType,
+        query: Any,
+        values: Optional[dict],
+        start: float,
+        rows: int,
+    ) -> None:
+        duration = time.perf_counter() - start
+        name = query_name(query, frame)
+        DB_QUERY_SECONDS.labels(name).observe(duration)
+        DB_QUERY_ROWS.labels(name).observe(rows)
+        slow_query_log = self.slow_query_log
+        if slow_query_log is not None and duration >= slow_query_log.threshold:
+            slow_query_log.record(
+                self,
+                query_name=name,
+                caller=caller_name(frame),
+                query=query,
+                values=values,
+                duration=duration,
+            )
+
+
+class ReplicaDatabase(InstrumentedDatabase):
+    """
+    Read-only database that retries failed connections on the primary and
+    sends reads straight to the primary for `retry_after` seconds afterwards.
+    """
+
+    fallback_errors = (
+        OSError,
+        asyncio.TimeoutError,
+        asyncpg.PostgresConnectionError,
+        asyncpg.CannotConnectNowError,
+    )
+
+    def __init__(
+        self, url: Any, *, primary: Database, retry_after: float, **options: Any
+    ) -> None:
+        super().__init__(url, **options)
+        self.primary = primary
+        self.retry_after = retry_after
+        self._unavailable_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    async def fetch_all(self, query: Any, values: dict = None) -> List[Mapping]:
+        if self.available:
+            try:
+                return await super().fetch_all(query, values)
+            except self.fallback_errors as e:
+                self._mark_unavailable(e)
+        return await self.primary.fetch_all(query, values)
+
+    async def fetch_one(self, query: Any, values: dict = None) -> Optional[Mapping]:
+        if self.available:
+            try:
+                return await super().fetch_one(query, values)
+            except self.fallback_errors as e:
+                self._mark_unavailable(e)
+        return await self.primary.fetch_one(query, values)
+
+    async def fetch_val(self, query: Any, values: dict = None, column: Any = 0) -> Any:
+        if self.available:
+            try:
+                return await super().fetch_val(query, values, column=column)
+            except self.fallback_errors as e:
+                self._mark_unavailable(e)
+        return await self.primary.fetch_val(query, values, column=column)
+
+    def _mark_unavailable(self, error: Exception) -> None:
+        if self.available:
+            logger.warning("Read replica unavailable, using the primary: %r", error)
+        self._unavailable_until = time.monotonic() + self.retry_after
+        DB_REPLICA_FALLBACKS.inc()
+
+
+class _InstrumentedBackend(DatabaseBackend):
+    def __init__(self, backend: DatabaseBackend, pool_timeout: Optional[float]) -> None:
+        self._backend = backend
+        self._pool_timeout = pool_timeout
+
+    async def connect(self) -> None:
+        await self._backend.connect()
+
+    async def disconnect(self) -> None:
+        await self._backend.disconnect()
+
+    def connection(self) -> ConnectionBackend:
+        return _InstrumentedConnection(self._backend.connection(), self._pool_timeout)
+
+
+class _InstrumentedConnection:
+    """Times pool checkouts of a backend connection and tracks them in use."""
+
+    def __init__(
+        self, connection: ConnectionBackend, pool_timeout: Optional[float]
+    ) -> None:
+        self._connection = connection
+        self._pool_timeout = pool_timeout
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+    async def acquire(self) -> None:
+        start = time.perf_counter()
+        try:
+            # Requests stop waiting for the pool at their deadline, but late
+            # checkouts still get a short wait of their own.
+            await asyncio.wait_for(
+                self._connection.acquire(), checkout_timeout(self._pool_timeout)
+            )
+        except asyncio.TimeoutError:
+            ADMISSION_REJECTIONS.labels("database", "pool_timeout").inc()
+            raise Overloaded("Timed out waiting for a database connection.")
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+        DB_CONNECTIONS_IN_USE.inc()
+
+    async def release(self) -> None:
+        await self._connection.release()
+        DB_CONNECTIONS_IN_USE.dec()
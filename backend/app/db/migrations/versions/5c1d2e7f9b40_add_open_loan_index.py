@@ -0,0 +1,45 @@
+"""add_open_loan_index
+
+Revision ID: 5c1d2e7f9b40
+Revises: a3581f615771
+Create Date: 2026-10-18 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "5c1d2e7f9b40"
+down_revision = "a3581f615771"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Concurrent borrows may already have left several open loans on a book;
+    # keep the newest one open and return the others now.
+    op.execute(
+        """
+        UPDATE histories SET returning_date = timezone('utc', now())
+        WHERE returning_date IS NULL
+          AND id NOT IN (
+            SELECT DISTINCT ON (book_id) id
+            FROM histories
+            WHERE returning_date IS NULL
+            ORDER BY book_id, borrowing_date DESC, id DESC
+          );
+        """
+    )
+    # At most one open loan per book, so concurrent borrows cannot both win.
+    op.create_index(
+        "ix_histories_open_loan",
+        "histories",
+        ["book_id"],
+        unique=True,
+        postgresql_where=sa.text("returning_date IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_histories_open_loan", table_name="histories")
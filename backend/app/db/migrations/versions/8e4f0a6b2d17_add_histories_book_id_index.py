@@ -0,0 +1,35 @@
+"""add_histories_book_id_index
+
+Revision ID: 8e4f0a6b2d17
+Revises: 5c1d2e7f9b40
+Create Date: 2026-10-18 10:04:55.218730
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = "8e4f0a6b2d17"
+down_revision = "5c1d2e7f9b40"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction block. The key matches the
+    # burrow history sort, and returning_date is included for index-only scans.
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_histories_book_id_borrowing_date
+            ON histories (book_id, borrowing_date DESC, id DESC)
+            INCLUDE (returning_date);
+            """
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_histories_book_id_borrowing_date;"
+        )
@@ -0,0 +1,54 @@
+"""add_books_search_indexes
+
+Revision ID: b7d93c1e4a62
+Revises: 8e4f0a6b2d17
+Create Date: 2026-10-18 11:27:08.661254
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = "b7d93c1e4a62"
+down_revision = "8e4f0a6b2d17"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # array_to_string is only STABLE, but generated columns need IMMUTABLE
+    # expressions; it is immutable for text[] so wrap it.
+    op.execute(
+        """
+        CREATE FUNCTION books_authors_text(authors text[]) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        AS $$ SELECT array_to_string(authors, ' ') $$;
+        """
+    )
+    # The 'simple' configuration does no stemming, which suits the mixed
+    # Thai and English catalog.
+    op.execute(
+        """
+        ALTER TABLE books ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(books_authors_text(authors), '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+        ) STORED;
+        """
+    )
+    op.create_index(
+        "ix_books_search_vector", "books", ["search_vector"], postgresql_using="gin"
+    )
+    op.create_index(
+        "ix_books_categories", "books", ["categories"], postgresql_using="gin"
+    )
+    op.create_index("ix_books_authors", "books", ["authors"], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_authors", table_name="books")
+    op.drop_index("ix_books_categories", table_name="books")
+    op.drop_index("ix_books_search_vector", table_name="books")
+    op.drop_column("books", "search_vector")
+    op.execute("DROP FUNCTION books_authors_text(text[]);")
@@ -0,0 +1,27 @@
+"""add_books_version
+
+Revision ID: d2a8f5e61c09
+Revises: b7d93c1e4a62
+Create Date: 2026-10-18 13:41:19.085342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "d2a8f5e61c09"
+down_revision = "b7d93c1e4a62"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "books",
+        sa.Column("version", sa.Integer, nullable=False, server_default="1"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("books", "version")
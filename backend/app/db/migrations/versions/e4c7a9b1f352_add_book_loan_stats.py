@@ -0,0 +1,117 @@
+"""add_book_loan_stats
+
+Revision ID: e4c7a9b1f352
+Revises: d2a8f5e61c09
+Create Date: 2026-10-18 15:02:47.316208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "e4c7a9b1f352"
+down_revision = "d2a8f5e61c09"
+branch_labels = None
+depends_on = None
+
+
+def create_book_loan_stats_table():
+    return op.create_table(
+        "book_loan_stats",
+        sa.Column(
+            "book_id",
+            sa.Integer,
+            sa.ForeignKey("books.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("loan_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("returned_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("total_loan_seconds", sa.Float, nullable=False, server_default="0"),
+        sa.Column("last_loan_seconds", sa.Float, nullable=True),
+        sa.Column("last_borrowing_date", sa.DateTime, nullable=True),
+        sa.Column("open_loan", sa.Boolean, nullable=False, server_default="false"),
+    )
+
+
+def upgrade() -> None:
+    create_book_loan_stats_table()
+    op.create_index("ix_book_loan_stats_loan_count", "book_loan_stats", ["loan_count"])
+    # Histories are append-only: a loan is inserted when a book is borrowed
+    # and its returning_date is set once when it comes back.
+    op.execute(
+        """
+        CREATE FUNCTION update_book_loan_stats() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            loan_seconds double precision;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO book_loan_stats AS stats
+                    (book_id, loan_count, last_borrowing_date, open_loan)
+                VALUES (NEW.book_id, 1, NEW.borrowing_date, NEW.returning_date IS NULL)
+                ON CONFLICT (book_id) DO UPDATE
+                SET loan_count = stats.loan_count + 1,
+                    last_borrowing_date = GREATEST(
+                        stats.last_borrowing_date, EXCLUDED.last_borrowing_date
+                    ),
+                    open_loan = stats.open_loan OR EXCLUDED.open_loan;
+            ELSIF OLD.returning_date IS NOT NULL THEN
+                RETURN NULL;
+            END IF;
+            IF NEW.returning_date IS NOT NULL THEN
+                loan_seconds := extract(
+                    epoch FROM NEW.returning_date - NEW.borrowing_date
+                );
+                UPDATE book_loan_stats
+                SET returned_count = returned_count + 1,
+                    total_loan_seconds = total_loan_seconds + loan_seconds,
+                    last_loan_seconds = loan_seconds,
+                    open_loan = open_loan AND TG_OP = 'INSERT'
+                WHERE book_id = NEW.book_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$;
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER histories_update_book_loan_stats
+        AFTER INSERT OR UPDATE OF returning_date ON histories
+        FOR EACH ROW EXECUTE FUNCTION update_book_loan_stats();
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO book_loan_stats (
+            book_id,
+            loan_count,
+            returned_count,
+            total_loan_seconds,
+            last_loan_seconds,
+            last_borrowing_date,
+            open_loan
+        )
+        SELECT book_id,
+               count(*),
+               count(returning_date),
+               coalesce(sum(extract(epoch FROM returning_date - borrowing_date)), 0),
+               (array_agg(
+                   extract(epoch FROM returning_date - borrowing_date)
+                   ORDER BY returning_date DESC
+               ) FILTER (WHERE returning_date IS NOT NULL))[1],
+               max(borrowing_date),
+               bool_or(returning_date IS NULL)
+        FROM histories
+        GROUP BY book_id;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER histories_update_book_loan_stats ON histories;")
+    op.execute("DROP FUNCTION update_book_loan_stats();")
+    op.drop_index("ix_book_loan_stats_loan_count", table_name="book_loan_stats")
+    op.drop_table("book_loan_stats")
@@ -0,0 +1,173 @@
+"""add_book_events
+
+Revision ID: f1b6d84c2a07
+Revises: e4c7a9b1f352
+Create Date: 2026-10-18 17:40:12.508613
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "f1b6d84c2a07"
+down_revision = "e4c7a9b1f352"
+branch_labels = None
+depends_on = None
+
+
+def create_book_events_table():
+    # No foreign key to books: events of deleted books are kept until compacted.
+    # seq stays NULL until the event is sequenced, see sequence_book_events().
+    op.create_table(
+        "book_events",
+        sa.Column("id", sa.BigInteger, primary_key=True),
+        sa.Column("seq", sa.BigInteger, nullable=True),
+        sa.Column("book_id", sa.Integer, nullable=False),
+        sa.Column("type", sa.Text, nullable=False),
+        sa.Column("version", sa.Integer, nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime,
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+    op.execute(
+        """
+        ALTER TABLE book_events
+        ADD COLUMN xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+        """
+    )
+    op.execute("CREATE SEQUENCE book_event_seq OWNED BY book_events.seq;")
+
+
+def create_book_events_compacted_table():
+    # Single row holding the highest compacted seq, so consumers resuming from
+    # before it can be told to re-scan.
+    op.create_table(
+        "book_events_compacted",
+        sa.Column("seq", sa.BigInteger, nullable=False),
+    )
+    op.execute("INSERT INTO book_events_compacted (seq) VALUES (0);")
+
+
+def upgrade() -> None:
+    create_book_events_table()
+    create_book_events_compacted_table()
+    op.create_index("ix_book_events_seq", "book_events", ["seq"], unique=True)
+    op.create_index(
+        "ix_book_events_unsequenced",
+        "book_events",
+        ["id"],
+        postgresql_where=sa.text("seq IS NULL"),
+    )
+    op.create_index("ix_book_events_created_at", "book_events", ["created_at"])
+    # Events are appended by triggers, in the transaction of the change, and
+    # take no locks beyond the inserted row.
+    op.execute(
+        """
+        CREATE FUNCTION append_book_event(
+            event_book_id integer, event_type text, event_version integer
+        ) RETURNS void
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            INSERT INTO book_events (book_id, type, version)
+            VALUES (event_book_id, event_type, event_version);
+            -- Identical notifications are folded into one per transaction.
+            PERFORM pg_notify('book_events', '');
+        END;
+        $$;
+        """
+    )
+    # Readers call this before reading. It numbers the events of transactions
+    # older than every running one, which can no longer change, so a seq is
+    # never handed out below one a consumer has already seen. Sequencers run
+    # one at a time; writers never wait for them.
+    op.execute(
+        """
+        CREATE FUNCTION sequence_book_events() RETURNS void
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtext('book_events_sequencer'));
+            UPDATE book_events
+            SET seq = sequenced.seq
+            FROM (
+                SELECT id, nextval('book_event_seq') AS seq
+                FROM (
+                    SELECT id
+                    FROM book_events
+                    WHERE seq IS NULL
+                      AND xid < pg_snapshot_xmin(pg_current_snapshot())
+                    ORDER BY id
+                ) AS finished
+            ) AS sequenced
+            WHERE book_events.id = sequenced.id;
+        END;
+        $$;
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION books_append_book_event() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM append_book_event(NEW.id, 'created', NEW.version);
+            ELSIF TG_OP = 'UPDATE' THEN
+                PERFORM append_book_event(NEW.id, 'updated', NEW.version);
+            ELSE
+                PERFORM append_book_event(OLD.id, 'deleted', OLD.version);
+            END IF;
+            RETURN NULL;
+        END;
+        $$;
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION histories_append_book_event() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM append_book_event(NEW.book_id, 'borrowed', NULL);
+            ELSIF OLD.returning_date IS NULL AND NEW.returning_date IS NOT NULL THEN
+                PERFORM append_book_event(NEW.book_id, 'returned', NULL);
+            END IF;
+            RETURN NULL;
+        END;
+        $$;
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER books_append_book_event
+        AFTER INSERT OR UPDATE OR DELETE ON books
+        FOR EACH ROW EXECUTE FUNCTION books_append_book_event();
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER histories_append_book_event
+        AFTER INSERT OR UPDATE OF returning_date ON histories
+        FOR EACH ROW EXECUTE FUNCTION histories_append_book_event();
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER histories_append_book_event ON histories;")
+    op.execute("DROP TRIGGER books_append_book_event ON books;")
+    op.execute("DROP FUNCTION histories_append_book_event();")
+    op.execute("DROP FUNCTION books_append_book_event();")
+    op.execute("DROP FUNCTION sequence_book_events();")
+    op.execute("DROP FUNCTION append_book_event(integer, text, integer);")
+    op.drop_index("ix_book_events_created_at", table_name="book_events")
+    op.drop_index("ix_book_events_unsequenced", table_name="book_events")
+    op.drop_index("ix_book_events_seq", table_name="book_events")
+    op.drop_table("book_events_compacted")
+    op.drop_table("book_events")
@@ -0,0 +1,37 @@
+import re
+from typing import Any, List, Mapping, Optional, Tuple
+
+_PARAMETER = re.compile(r"(?<![:\w]):(\w+)")
+
+
+class PreparedQuery(str):
+    """
+    A fixed SQL query whose `:name` parameters are rewritten to asyncpg's `$n`
+    placeholders once, at import time.
+
+    It is still a `str`, so any `Database` can run it as usual, while
+    `InstrumentedDatabase` sends `sql` straight to the pooled asyncpg
+    connection. asyncpg prepares each statement once per connection and reuses
+    it from its statement cache, and rows come back as plain asyncpg records.
+    """
+
+    sql: str
+    parameters: Tuple[str, ...]
+
+    def __new__(cls, query: str) -> "PreparedQuery":
+        prepared = super().__new__(cls, query)
+        parameters: List[str] = []
+
+        def placeholder(match: "re.Match[str]") -> str:
+            name = match.group(1)
+            if name not in parameters:
+                parameters.append(name)
+            return f"${parameters.index(name) + 1}"
+
+        prepared.sql = _PARAMETER.sub(placeholder, query)
+        prepared.parameters = tuple(parameters)
+        return prepared
+
+    def arguments(self, values: Optional[Mapping[str, Any]]) -> List[Any]:
+        values = values or {}
+        return [values[name] for name in self.parameters]
@@ -0,0 +1,83 @@
+from typing import List
+
+from ...db.repositories.base import BaseRepository
+from ...models.analytics import BookLoanStats, CategoryMeanLoanDurations, Utilization
+
+GET_MOST_BORROWED_BOOKS_QUERY = """
+SELECT stats.book_id, books.title, stats.loan_count, stats.returned_count,
+       stats.open_loan, stats.total_loan_seconds, stats.last_loan_seconds,
+       stats.total_loan_seconds / NULLIF(stats.returned_count, 0) AS mean_loan_seconds,
+       stats.last_borrowing_date
+FROM book_loan_stats AS stats
+JOIN books ON books.id = stats.book_id
+ORDER BY stats.loan_count DESC, stats.book_id
+LIMIT :limit;
+"""
+
+COUNT_BORROWED_BOOKS_QUERY = """
+SELECT count(*) FROM book_loan_stats WHERE open_loan;
+"""
+
+GET_CATEGORY_MEAN_LOAN_DURATIONS_QUERY = """
+SELECT category,
+       count(*) AS books,
+       sum(stats.returned_count) AS loans,
+       percentile_cont(CAST(:percentiles AS double precision[])) WITHIN GROUP (
+           ORDER BY stats.total_loan_seconds / stats.returned_count
+       ) AS mean_loan_seconds
+FROM book_loan_stats AS stats
+JOIN books ON books.id = stats.book_id,
+     unnest(books.categories) AS category
+WHERE stats.returned_count > 0
+GROUP BY category
+ORDER BY loans DESC, category
+LIMIT :limit;
+"""
+
+
+class AnalyticsRepository(BaseRepository):
+    """Dashboard queries over book_loan_stats, which triggers keep current."""
+
+    async def get_most_borrowed_books(self, *, limit: int) -> List[BookLoanStats]:
+        books = await self.read_db.fetch_all(
+            query=GET_MOST_BORROWED_BOOKS_QUERY, values={"limit": limit}
+        )
+        return [BookLoanStats(**book) for book in books]
+
+    async def get_utilization(self, *, books: int) -> Utilization:
+        """
+        Share of `books` currently borrowed. `books` may be an estimate, so the
+        share is capped at 1.
+        """
+        borrowed = await self.read_db.fetch_val(query=COUNT_BORROWED_BOOKS_QUERY)
+        return Utilization(
+            books=books,
+            borrowed=borrowed,
+            utilization=min(borrowed / books, 1.0) if books else 0.0,
+        )
+
+    async def get_category_mean_loan_durations(
+        self, *, percentiles: List[float], limit: int
+    ) -> List[CategoryMeanLoanDurations]:
+        """
+        Compute every requested percentile per category in one ordered-set
+        aggregate over the per-book mean loan durations.
+        """
+        categories = await self.read_db.fetch_all(
+            query=GET_CATEGORY_MEAN_LOAN_DURATIONS_QUERY,
+            values={"percentiles": percentiles, "limit": limit},
+        )
+        return [
+            CategoryMeanLoanDurations(
+                category=category["category"],
+                books=category["books"],
+                loans=category["loans"],
+                mean_loan_seconds_percentiles={
+                    str(fraction): seconds
+                    for fraction, seconds in zip(
+                        percentiles, category["mean_loan_seconds"]
+                    )
+                },
+            )
+            for category in categories
+        ]
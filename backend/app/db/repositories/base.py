@@ -1,8 +1,20 @@
-from typing import NoReturn
+from typing import NoReturn, Optional
 
 from databases import Database
 
+from ..cache import CacheBackend
+from ..coalescing import SingleFlight
+
 
 class BaseRepository:
-    def __init__(self, db: Database) -> NoReturn:
+    def __init__(
+        self,
+        db: Database,
+        cache: Optional[CacheBackend] = None,
+        read_db: Optional[Database] = None,
+        single_flight: Optional[SingleFlight] = None,
+    ) -> NoReturn:
         self.db = db
+        self.read_db = read_db if read_db is not None else db
+        self.cache = cache
+        self.single_flight = single_flight
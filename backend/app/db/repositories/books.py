@@ -1,40 +1,217 @@
-from typing import Optional, List
+from collections import defaultdict, deque
+from functools import lru_cache
+from typing import Any, AsyncIterator, Deque, Dict, Optional, List, Tuple
 
+from ...db.coalescing import coalesce
+from ...db.prepared import PreparedQuery
 from ...db.repositories.base import BaseRepository
-from ...models.book import BookCreate, BookResponse, BookUpdate
+from ...models.book import (
+    BaseBook,
+    BookCreate,
+    BookResponse,
+    BookSearchResponse,
+    BookSearchResult,
+    BookUpdate,
+    FacetCount,
+    book_projection,
+)
+from ...models.core import CoreModel
 
-CREATE_BOOK_QUERY = """
+BOOK_COLUMNS = (
+    "isbn10",
+    "isbn13",
+    "title",
+    "description",
+    "authors",
+    "categories",
+    "page_count",
+    "published_date",
+)
+
+CREATE_BOOK_QUERY = PreparedQuery(
+    """
 INSERT INTO books (isbn10, isbn13, title, description, authors, categories, page_count, published_date)
 VALUES (:isbn10, :isbn13, :title, :description, :authors, :categories, :page_count, :published_date)
-RETURNING *;
+RETURNING id, isbn10, isbn13, title, description, authors, categories, page_count, published_date, version;
+"""
+)
+
+GET_BOOK_BY_ID_QUERY = PreparedQuery(
+    """
+SELECT id, isbn10, isbn13, title, description, authors, categories, page_count, published_date, version
+FROM books
+WHERE id = :id;
 """
+)
+
+# Answered from the ix_histories_open_loan partial index.
+OPEN_LOAN_EXISTS = """EXISTS (
+  SELECT 1 FROM histories
+  WHERE histories.book_id = books.id AND histories.returning_date IS NULL
+)"""
 
-GET_BOOK_BY_ID_QUERY = """
-SELECT id, isbn10, isbn13, title, description, authors, categories, page_count, published_date
+# Selected expressions of fields that are not plain book columns.
+BOOK_FIELD_COLUMNS = {"available": f"NOT {OPEN_LOAN_EXISTS} AS available"}
+
+AVAILABLE_CONDITIONS = {
+    None: "true",
+    True: f"NOT {OPEN_LOAN_EXISTS}",
+    False: OPEN_LOAN_EXISTS,
+}
+
+# Projections and filters of GET_BOOK_BY_ID_QUERY and GET_BOOKS_QUERY; {columns}
+# only ever holds whitelisted book fields.
+GET_BOOK_FIELDS_BY_ID_QUERY = """
+SELECT {columns}
 FROM books
 WHERE id = :id;
 """
 
-GET_BOOKS_QUERY = """
-SELECT id, isbn10, isbn13, title, description, authors, categories, page_count, published_date
+GET_BOOKS_FIELDS_QUERY = """
+SELECT {columns}
+FROM books
+WHERE {conditions}
+ORDER BY id
+LIMIT :limit
+OFFSET :offset;
+"""
+
+GET_BOOKS_FIELDS_AFTER_ID_QUERY = """
+SELECT {columns}
+FROM books
+WHERE id > :after_id AND {conditions}
+ORDER BY id
+LIMIT :limit;
+"""
+
+GET_BOOK_VERSION_QUERY = PreparedQuery(
+    """
+SELECT version FROM books WHERE id = :id;
+"""
+)
+
+GET_BOOK_VERSIONS_QUERY = PreparedQuery(
+    """
+SELECT id, version
 FROM books
 ORDER BY id
 LIMIT :limit
 OFFSET :offset;
 """
+)
+
+GET_BOOK_VERSIONS_AFTER_ID_QUERY = PreparedQuery(
+    """
+SELECT id, version
+FROM books
+WHERE id > :after_id
+ORDER BY id
+LIMIT :limit;
+"""
+)
+
+GET_BOOKS_QUERY = PreparedQuery(
+    """
+SELECT id, isbn10, isbn13, title, description, authors, categories, page_count, published_date, version
+FROM books
+ORDER BY id
+LIMIT :limit
+OFFSET :offset;
+"""
+)
+
+GET_BOOKS_AFTER_ID_QUERY = PreparedQuery(
+    """
+SELECT id, isbn10, isbn13, title, description, authors, categories, page_count, published_date, version
+FROM books
+WHERE id > :after_id
+ORDER BY id
+LIMIT :limit;
+"""
+)
+
+COUNT_BOOKS_QUERY = PreparedQuery(
+    """
+SELECT count(*) FROM books;
+"""
+)
+
+# The planner's own estimate: tuples per page as of the last ANALYZE, scaled to
+# the table's current size. NULL until the table has been analyzed.
+ESTIMATE_BOOK_COUNT_QUERY = PreparedQuery(
+    """
+SELECT CASE
+         WHEN reltuples < 0 OR relpages = 0 THEN NULL
+         ELSE reltuples / relpages * (pg_relation_size(oid) / current_setting('block_size')::integer)
+       END
+FROM pg_class
+WHERE oid = 'books'::regclass;
+"""
+)
+
+EXPORT_BOOKS_QUERY = """
+SELECT id, isbn10, isbn13, title, description, authors, categories, page_count, published_date, version
+FROM books
+WHERE id > :after_id
+ORDER BY id;
+"""
 
 UPDATE_BOOKS_QUERY = """
-UPDATE books 
-SET isbn10 = :isbn10, isbn13 = :isbn13, title = :title, description = :description, authors = :authors,
-    categories = :categories, page_count = :page_count, published_date = :published_date
-WHERE id = :id
-RETURNING *; 
+UPDATE books
+SET {assignments}, version = version + 1
+WHERE id = :id{version_condition}
+RETURNING id, isbn10, isbn13, title, description, authors, categories, page_count, published_date, version;
 """
 
-DELETE_BOOK_QUERY = """
-DELETE FROM books WHERE id = :id RETURNING *;
+SEARCH_BOOKS_QUERY = """
+SELECT id, isbn10, isbn13, title, description, authors, categories, page_count, published_date, version,
+       {rank} AS rank, count(*) OVER () AS total
+FROM books{from_query}
+WHERE {conditions}
+ORDER BY rank DESC, id
+LIMIT :limit
+OFFSET :offset;
 """
 
+COUNT_SEARCH_BOOKS_QUERY = """
+SELECT count(*) FROM books{from_query} WHERE {conditions};
+"""
+
+SEARCH_BOOKS_FACETS_QUERY = """
+(SELECT 'categories' AS facet, value, count(*) AS count
+ FROM books{from_query}, unnest(categories) AS value
+ WHERE {conditions}
+ GROUP BY value
+ ORDER BY count DESC, value
+ LIMIT :facet_limit)
+UNION ALL
+(SELECT 'authors' AS facet, value, count(*) AS count
+ FROM books{from_query}, unnest(authors) AS value
+ WHERE {conditions}
+ GROUP BY value
+ ORDER BY count DESC, value
+ LIMIT :facet_limit);
+"""
+
+GET_EXISTING_ISBNS_QUERY = """
+SELECT isbn10, isbn13
+FROM books
+WHERE isbn10 = ANY(CAST(:isbn10s AS text[])) OR isbn13 = ANY(CAST(:isbn13s AS text[]));
+"""
+
+DELETE_BOOK_QUERY = PreparedQuery(
+    """
+DELETE FROM books WHERE id = :id
+RETURNING id, isbn10, isbn13, title, description, authors, categories, page_count, published_date, version;
+"""
+)
+
+BOOK_COUNT_CACHE_KEY = "books:count"
+
+ISBN_COLUMNS = ("isbn10", "isbn13")
+
+BOOK_RESPONSE_FIELDS = tuple(BookResponse.__fields__)
+
 
 class BookRepository(BaseRepository):
     async def create_book(self, *, new_book: BookCreate) -> BookResponse:
@@ -42,44 +219,333 @@ class BookRepository(BaseRepository):
         created_book = await self.db.fetch_one(
             query=CREATE_BOOK_QUERY, values=query_value
         )
-        return BookResponse(**created_book)
+        # Rows of the prepared book queries already carry exactly the model's
+        # columns and types, so they skip validation.
+        return BookResponse.construct(**created_book)
+
+    async def create_books(
+        self, *, new_books: List[BookCreate], batch_size: int
+    ) -> List[Optional[BookResponse]]:
+        """
+        Insert books with multi-row INSERTs inside a single transaction. Items
+        rejected by the isbn10/isbn13 unique constraints are returned as None.
+        """
+        created_books: List[Optional[BookResponse]] = []
+        async with self.db.transaction():
+            for start in range(0, len(new_books), batch_size):
+                batch = new_books[start : start + batch_size]
+                query_value = {
+                    f"{column}_{index}": value
+                    for index, book in enumerate(batch)
+                    for column, value in book.dict().items()
+                }
+                rows = await self.db.fetch_all(
+                    query=_create_books_query(len(batch)), values=query_value
+                )
+                # RETURNING only yields inserted rows, so match them back to
+                # their input items by content rather than by position.
+                inserted: Dict[Tuple, Deque[BookResponse]] = defaultdict(deque)
+                for row in rows:
+                    book = BookResponse(**row)
+                    inserted[_book_key(book)].append(book)
+                for book in batch:
+                    matches = inserted[_book_key(book)]
+                    created_books.append(matches.popleft() if matches else None)
+        return created_books
+
+    async def get_isbn_conflicts(
+        self, *, new_books: List[BookCreate]
+    ) -> List[Tuple[str, ...]]:
+        """
+        Return, per book, the unique columns ("isbn10", "isbn13") whose value
+        an existing book already has.
+        """
+        rows = await self.db.fetch_all(
+            query=GET_EXISTING_ISBNS_QUERY,
+            values={
+                "isbn10s": [book.isbn10 for book in new_books if book.isbn10],
+                "isbn13s": [book.isbn13 for book in new_books if book.isbn13],
+            },
+        )
+        existing = {column: {row[column] for row in rows} for column in ISBN_COLUMNS}
+        return [
+            tuple(
+                column
+                for column in ISBN_COLUMNS
+                if getattr(book, column) and getattr(book, column) in existing[column]
+            )
+            for book in new_books
+        ]
 
-    async def get_book_by_id(self, *, id: int) -> Optional[BookResponse]:
-        book = await self.db.fetch_one(query=GET_BOOK_BY_ID_QUERY, values={"id": id})
+    @coalesce
+    async def get_book_by_id(
+        self, *, id: int, fields: Optional[Tuple[str, ...]] = None
+    ) -> Optional[BookResponse]:
+        """
+        Return the book, or only its `fields` as a reduced model. Projections
+        are cut from a cached book when there is one, and are not cached.
+        """
+        # Availability is not part of the cached book.
+        if self.cache is not None and "available" not in (fields or ()):
+            cached_book = await self.cache.get(_cache_key(id))
+            if cached_book is not None:
+                if fields is not None:
+                    return _project(cached_book, fields)
+                return cached_book
+        if fields is not None:
+            book = await self.read_db.fetch_one(
+                query=_projection_query(GET_BOOK_FIELDS_BY_ID_QUERY, fields),
+                values={"id": id},
+            )
+            return book_projection(fields).construct(**book) if book else None
+        book = await self.read_db.fetch_one(
+            query=GET_BOOK_BY_ID_QUERY, values={"id": id}
+        )
         if not book:
             return None
-        return BookResponse(**book)
+        book = BookResponse.construct(**book)
+        # A lagging replica could refill the cache with a row that was just
+        # updated or deleted, so only reads from the primary are cached.
+        if self.cache is not None and self.read_db is self.db:
+            await self.cache.set(_cache_key(id), book)
+        return book
+
+    @coalesce
+    async def get_book_version(self, *, id: int) -> Optional[int]:
+        """Return only the book's version, from the cache when possible."""
+        if self.cache is not None:
+            cached_book = await self.cache.get(_cache_key(id))
+            if cached_book is not None:
+                return cached_book.version
+        return await self.read_db.fetch_val(
+            query=GET_BOOK_VERSION_QUERY, values={"id": id}
+        )
+
+    @coalesce
+    async def get_book_versions(
+        self, *, limit: int, offset: int = 0, after_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """Return the (id, version) pairs of the page `get_books` would return."""
+        if after_id is not None:
+            rows = await self.read_db.fetch_all(
+                query=GET_BOOK_VERSIONS_AFTER_ID_QUERY,
+                values={"limit": limit, "after_id": after_id},
+            )
+        else:
+            rows = await self.read_db.fetch_all(
+                query=GET_BOOK_VERSIONS_QUERY, values={"limit": limit, "offset": offset}
+            )
+        return [(row["id"], row["version"]) for row in rows]
 
+    @coalesce
     async def get_books(
-        self, *, limit: int, offset: int
+        self,
+        *,
+        limit: int,
+        offset: int = 0,
+        after_id: Optional[int] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+        available: Optional[bool] = None,
     ) -> Optional[List[BookResponse]]:
-        books = await self.db.fetch_all(
-            query=GET_BOOKS_QUERY, values={"limit": limit, "offset": offset}
-        )
+        """
+        Return a page of books, or only their `fields` as reduced models. When
+        `available` is given, only books with (False) or without (True) an
+        open loan are returned.
+        """
+        if fields is None and available is None:
+            queries = (GET_BOOKS_QUERY, GET_BOOKS_AFTER_ID_QUERY)
+        else:
+            columns = fields or BOOK_RESPONSE_FIELDS
+            conditions = AVAILABLE_CONDITIONS[available]
+            queries = (
+                _projection_query(GET_BOOKS_FIELDS_QUERY, columns, conditions),
+                _projection_query(GET_BOOKS_FIELDS_AFTER_ID_QUERY, columns, conditions),
+            )
+        if after_id is not None:
+            books = await self.read_db.fetch_all(
+                query=queries[1], values={"limit": limit, "after_id": after_id}
+            )
+        else:
+            books = await self.read_db.fetch_all(
+                query=queries[0], values={"limit": limit, "offset": offset}
+            )
         if not books:
             return None
-        return [BookResponse(**book) for book in books]
+        model = book_projection(fields) if fields is not None else BookResponse
+        return [model.construct(**book) for book in books]
+
+    @coalesce
+    async def count_books(self, *, cache_ttl: float) -> int:
+        """Count every book, caching the count for `cache_ttl` seconds."""
+        if self.cache is not None:
+            count = await self.cache.get(BOOK_COUNT_CACHE_KEY)
+            if count is not None:
+                return count
+        count = await self.read_db.fetch_val(query=COUNT_BOOKS_QUERY)
+        if self.cache is not None:
+            await self.cache.set(BOOK_COUNT_CACHE_KEY, count, ttl=cache_ttl)
+        return count
+
+    @coalesce
+    async def estimate_book_count(self, *, cache_ttl: float) -> int:
+        """
+        Estimate the book count from table statistics, falling back to the
+        cached exact count while the table has not been analyzed yet.
+        """
+        estimate = await self.read_db.fetch_val(query=ESTIMATE_BOOK_COUNT_QUERY)
+        if estimate is None:
+            return await self.count_books(cache_ttl=cache_ttl)
+        return round(estimate)
+
+    async def iterate_books(self, *, after_id: int = 0) -> AsyncIterator[BookResponse]:
+        """Stream every book from a server-side cursor, ordered by id."""
+        async for book in self.db.iterate(
+            query=EXPORT_BOOKS_QUERY, values={"after_id": after_id}
+        ):
+            yield BookResponse(**book)
+
+    @coalesce
+    async def search_books(
+        self,
+        *,
+        q: Optional[str],
+        categories: Optional[List[str]],
+        authors: Optional[List[str]],
+        limit: int,
+        offset: int,
+        facet_limit: int,
+    ) -> BookSearchResponse:
+        conditions = ["true"]
+        query_value: Dict[str, Any] = {}
+        if q:
+            conditions.append("search_vector @@ query")
+            query_value["q"] = q
+        if categories:
+            conditions.append("categories @> CAST(:categories AS text[])")
+            query_value["categories"] = categories
+        if authors:
+            conditions.append("authors @> CAST(:authors AS text[])")
+            query_value["authors"] = authors
+        query_parts = {
+            "conditions": " AND ".join(conditions),
+            "from_query": ", websearch_to_tsquery('simple', :q) AS query" if q else "",
+        }
+
+        books = await self.db.fetch_all(
+            query=SEARCH_BOOKS_QUERY.format(
+                rank="ts_rank_cd(search_vector, query)" if q else "NULL::real",
+                **query_parts,
+            ),
+            values={**query_value, "limit": limit, "offset": offset},
+        )
+        if books:
+            total = books[0]["total"]
+        elif offset:
+            # The window total only exists on returned rows, so count separately
+            # when the offset is past the last match.
+            total = await self.db.fetch_val(
+                query=COUNT_SEARCH_BOOKS_QUERY.format(**query_parts),
+                values=query_value,
+            )
+        else:
+            total = 0
+        facet_counts = await self.db.fetch_all(
+            query=SEARCH_BOOKS_FACETS_QUERY.format(**query_parts),
+            values={**query_value, "facet_limit": facet_limit},
+        )
+
+        facets: Dict[str, List[FacetCount]] = {"categories": [], "authors": []}
+        for facet_count in facet_counts:
+            facets[facet_count["facet"]].append(FacetCount(**facet_count))
+        return BookSearchResponse(
+            total=total,
+            books=[BookSearchResult(**book) for book in books],
+            facets=facets,
+        )
 
     async def update_book(
-        self, *, id: int, update_data: BookUpdate
+        self, *, id: int, update_data: BookUpdate, version: Optional[int] = None
     ) -> Optional[BookResponse]:
-        book_in_db = await self.db.fetch_one(
-            query=GET_BOOK_BY_ID_QUERY, values={"id": id}
-        )
-        if not book_in_db:
-            return None
-        book = BookResponse(**book_in_db)
-        update = book.copy(update=update_data.dict(exclude_unset=True))
-        query_value = update.dict()
+        """
+        Write only the provided fields in a single statement. When `version`
+        is given the update only applies if the stored version still matches,
+        otherwise None is returned.
+        """
+        update = update_data.dict(exclude_unset=True)
+        if not update:
+            book = await self.get_book_by_id(id=id)
+            if book and version is not None and book.version != version:
+                return None
+            return book
+
+        query_value = {**update, "id": id}
+        if version is not None:
+            query_value["version"] = version
+        version_condition = " AND version = :version" if version is not None else ""
         updated_book = await self.db.fetch_one(
-            query=UPDATE_BOOKS_QUERY, values=query_value
+            query=UPDATE_BOOKS_QUERY.format(
+                assignments=", ".join(f"{column} = :{column}" for column in update),
+                version_condition=version_condition,
+            ),
+            values=query_value,
         )
-        return BookResponse(**updated_book)
+        if not updated_book:
+            await self._invalidate(id)
+            return None
+        book = BookResponse(**updated_book)
+        # Write through so cached reads never go back to a lagging replica for
+        # a book that was just updated.
+        if self.cache is not None:
+            await self.cache.set(_cache_key(id), book)
+        return book
 
     async def delete_book(self, *, id: int) -> Optional[BookResponse]:
         deleted_book = await self.db.fetch_one(
             query=DELETE_BOOK_QUERY, values={"id": id}
         )
+        await self._invalidate(id)
         if not deleted_book:
             return None
-        return BookResponse(**deleted_book)
+        return BookResponse.construct(**deleted_book)
+
+    async def _invalidate(self, id: int) -> None:
+        if self.cache is not None:
+            await self.cache.delete(_cache_key(id))
+
+
+def _create_books_query(size: int) -> str:
+    rows = ",\n".join(
+        "(" + ", ".join(f":{column}_{index}" for column in BOOK_COLUMNS) + ")"
+        for index in range(size)
+    )
+    return f"""
+INSERT INTO books ({", ".join(BOOK_COLUMNS)})
+VALUES {rows}
+ON CONFLICT DO NOTHING
+RETURNING id, {", ".join(BOOK_COLUMNS)}, version;
+"""
+
+
+def _book_key(book: BaseBook) -> Tuple:
+    return tuple(
+        tuple(value) if isinstance(value, list) else value
+        for value in (getattr(book, column) for column in BOOK_COLUMNS)
+    )
+
+
+@lru_cache(maxsize=None)
+def _projection_query(
+    template: str, fields: Tuple[str, ...], conditions: str = "true"
+) -> PreparedQuery:
+    columns = ", ".join(BOOK_FIELD_COLUMNS.get(name, name) for name in fields)
+    return PreparedQuery(template.format(columns=columns, conditions=conditions))
+
+
+def _project(book: BookResponse, fields: Tuple[str, ...]) -> CoreModel:
+    return book_projection(fields).construct(
+        **{name: getattr(book, name) for name in fields}
+    )
+
+
+def _cache_key(id: int) -> str:
+    return f"book:{id}"
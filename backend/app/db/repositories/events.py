@@ -0,0 +1,86 @@
+from typing import List, Optional
+
+from ...db.prepared import PreparedQuery
+from ...db.repositories.base import BaseRepository
+from ...models.event import BookEvent
+
+GET_BOOK_EVENTS_QUERY = PreparedQuery(
+    """
+SELECT seq, book_id, type, version, created_at
+FROM book_events
+WHERE seq > :after_seq
+ORDER BY seq
+LIMIT :limit;
+"""
+)
+
+SEQUENCE_BOOK_EVENTS_QUERY = PreparedQuery(
+    """
+SELECT sequence_book_events();
+"""
+)
+
+GET_COMPACTED_SEQ_QUERY = PreparedQuery(
+    """
+SELECT seq FROM book_events_compacted;
+"""
+)
+
+# created_at is the writer's transaction start, which does not follow seq
+# order, so it only picks the cutoff and whole seq prefixes are deleted.
+COMPACT_BOOK_EVENTS_QUERY = """
+WITH cutoff AS (
+  SELECT max(seq) AS seq
+  FROM book_events
+  WHERE seq IS NOT NULL
+    AND created_at < now() - make_interval(secs => :retention_seconds)
+), compacted AS (
+  DELETE FROM book_events
+  USING cutoff
+  WHERE book_events.seq <= cutoff.seq
+  RETURNING book_events.seq
+)
+UPDATE book_events_compacted
+SET seq = GREATEST(book_events_compacted.seq, (SELECT seq FROM cutoff))
+RETURNING (SELECT count(*) FROM compacted) AS count;
+"""
+
+
+class EventRepository(BaseRepository):
+    """
+    Reads the book_events outbox, which triggers append to in the transaction
+    of every book and loan change. Events are read from the primary, which is
+    also where change notifications come from.
+    """
+
+    async def get_events(
+        self, *, after_seq: int, limit: int
+    ) -> Optional[List[BookEvent]]:
+        """
+        Return up to `limit` events after `after_seq`, or None when some of the
+        events after `after_seq` have already been compacted.
+        """
+        await self.db.execute(query=SEQUENCE_BOOK_EVENTS_QUERY)
+        events = await self.db.fetch_all(
+            query=GET_BOOK_EVENTS_QUERY,
+            values={"after_seq": after_seq, "limit": limit},
+        )
+        # Checked after reading, so a compaction running in between is caught.
+        if after_seq < await self.get_compacted_seq():
+            return None
+        return [BookEvent.construct(**event) for event in events]
+
+    async def get_compacted_seq(self) -> int:
+        """Return the highest seq removed by compaction."""
+        return await self.db.fetch_val(query=GET_COMPACTED_SEQ_QUERY)
+
+    async def compact_events(self, *, retention_seconds: float) -> int:
+        """
+        Delete every event up to the newest sequenced one older than
+        `retention_seconds`, and return how many were deleted.
+        """
+        await self.db.execute(query=SEQUENCE_BOOK_EVENTS_QUERY)
+        return await self.db.fetch_val(
+            query=COMPACT_BOOK_EVENTS_QUERY,
+            values={"retention_seconds": retention_seconds},
+        )
@@ -1,66 +1,224 @@
-from typing import Optional, List
+import datetime
+from typing import AsyncIterator, Dict, Mapping, Optional, List, Tuple
 
+from ...db.coalescing import coalesce
+from ...db.prepared import PreparedQuery
 from ...db.repositories.base import BaseRepository
-from ...models.history import BorrowingHistory, ReturningHistory, HistoryResponse
+from ...models.book import BookAvailability
+from ...models.history import BorrowingHistory, HistoryInDB, HistoryResponse
 
-GET_BOOK_LATEST_HISTORY_QUERY = """
-SELECT id, book_id, borrowing_date, returning_date
-FROM histories
-WHERE book_id = :book_id
-ORDER BY borrowing_date DESC, returning_date DESC
-LIMIT 1;
+# One open-loan probe per requested book, on the ix_histories_open_loan index.
+GET_BOOKS_AVAILABILITY_QUERY = PreparedQuery(
+    """
+SELECT books.id AS book_id,
+       NOT EXISTS (
+         SELECT 1 FROM histories
+         WHERE histories.book_id = books.id AND histories.returning_date IS NULL
+       ) AS available
+FROM unnest(CAST(:book_ids AS integer[])) WITH ORDINALITY AS requested (id, position)
+JOIN books ON books.id = requested.id
+ORDER BY requested.position;
 """
+)
 
-BORROW_BOOK_QUERY = """
-INSERT INTO histories (book_id, borrowing_date, returning_date)
-VALUES (:book_id, :borrowing_date, :returning_date)
+BORROW_BOOK_QUERY = PreparedQuery(
+    """
+INSERT INTO histories (book_id, borrowing_date)
+SELECT id, :borrowing_date
+FROM books
+WHERE id = :book_id
+  AND NOT EXISTS (
+    SELECT 1 FROM histories WHERE book_id = :book_id AND returning_date IS NULL
+  )
+ON CONFLICT (book_id) WHERE returning_date IS NULL DO NOTHING
 RETURNING *;
 """
+)
 
-RETURN_BOOK_QUERY = """
+RETURN_BOOK_QUERY = PreparedQuery(
+    """
 UPDATE histories
 SET returning_date = :returning_date
-WHERE id = :id AND book_id = :book_id AND borrowing_date = :borrowing_date
+WHERE book_id = :book_id AND returning_date IS NULL
 RETURNING *;
 """
+)
+
+# Loans for many books are opened or closed in one statement, which runs in a
+# single transaction. Each requested book gets a row: book_exists is false for
+# unknown ids and borrowing_date is NULL when the book could not be changed.
+BORROW_BOOKS_QUERY = PreparedQuery(
+    """
+WITH requested AS (
+  SELECT DISTINCT unnest(CAST(:book_ids AS integer[])) AS book_id
+), borrowed AS (
+  INSERT INTO histories (book_id, borrowing_date)
+  SELECT books.id, CAST(:borrowing_date AS timestamp)
+  FROM requested
+  JOIN books ON books.id = requested.book_id
+  WHERE NOT EXISTS (
+    SELECT 1 FROM histories
+    WHERE histories.book_id = books.id AND histories.returning_date IS NULL
+  )
+  ON CONFLICT (book_id) WHERE returning_date IS NULL DO NOTHING
+  RETURNING book_id, borrowing_date, returning_date
+)
+SELECT requested.book_id, books.id IS NOT NULL AS book_exists,
+       borrowed.borrowing_date, borrowed.returning_date
+FROM requested
+LEFT JOIN books ON books.id = requested.book_id
+LEFT JOIN borrowed ON borrowed.book_id = requested.book_id;
+"""
+)
+
+RETURN_BOOKS_QUERY = PreparedQuery(
+    """
+WITH requested AS (
+  SELECT DISTINCT unnest(CAST(:book_ids AS integer[])) AS book_id
+), returned AS (
+  UPDATE histories
+  SET returning_date = CAST(:returning_date AS timestamp)
+  FROM requested
+  WHERE histories.book_id = requested.book_id
+    AND histories.returning_date IS NULL
+  RETURNING histories.book_id, histories.borrowing_date, histories.returning_date
+)
+SELECT requested.book_id, books.id IS NOT NULL AS book_exists,
+       returned.borrowing_date, returned.returning_date
+FROM requested
+LEFT JOIN books ON books.id = requested.book_id
+LEFT JOIN returned ON returned.book_id = requested.book_id;
+"""
+)
 
 GET_BOOK_HISTORIES_QUERY = """
-SELECT book_id, borrowing_date, returning_date
+SELECT id, book_id, borrowing_date, returning_date
+FROM histories
+WHERE book_id = :book_id{conditions}
+ORDER BY borrowing_date DESC, id DESC
+LIMIT :limit;
+"""
+
+EXPORT_HISTORIES_QUERY = """
+SELECT id, book_id, borrowing_date, returning_date
 FROM histories
-WHERE book_id = :book_id
-ORDER BY borrowing_date DESC, returning_date DESC
+WHERE id > :after_id
+ORDER BY id;
 """
 
 
 class HistoryRepository(BaseRepository):
-    async def get_book_latest_history(self, *, book_id: int) -> Optional[HistoryResponse]:
-        history = await self.db.fetch_one(
-            query=GET_BOOK_LATEST_HISTORY_QUERY, values={"book_id": book_id}
+    async def get_books_availability(
+        self, *, book_ids: List[int]
+    ) -> List[BookAvailability]:
+        """Return whether each existing book is available, in `book_ids` order."""
+        books = await self.read_db.fetch_all(
+            query=GET_BOOKS_AVAILABILITY_QUERY, values={"book_ids": book_ids}
         )
-        if not history:
-            return None
-        return HistoryResponse(**history)
+        return [BookAvailability.construct(**book) for book in books]
 
     async def borrow_book(
         self, *, borrowing_history: BorrowingHistory
-    ) -> HistoryResponse:
-        query_value = borrowing_history.dict()
+    ) -> Optional[HistoryResponse]:
+        """Open a loan, or return None if the book is missing or already on loan."""
+        query_value = borrowing_history.dict(include={"book_id", "borrowing_date"})
         created_history = await self.db.fetch_one(
             query=BORROW_BOOK_QUERY, values=query_value
         )
+        if not created_history:
+            return None
         return HistoryResponse(**created_history)
 
     async def return_book(
-        self, *, returning_history: ReturningHistory
+        self, *, book_id: int, returning_date: datetime.datetime
     ) -> Optional[HistoryResponse]:
-        query_value = returning_history.dict()
+        """Close the open loan, or return None if the book has none."""
         updated_history = await self.db.fetch_one(
-            query=RETURN_BOOK_QUERY, values=query_value
+            query=RETURN_BOOK_QUERY,
+            values={"book_id": book_id, "returning_date": returning_date},
         )
+        if not updated_history:
+            return None
         return HistoryResponse(**updated_history)
 
-    async def get_borrow_history(self, *, book_id: int) -> Optional[List[HistoryResponse]]:
-        histories = await self.db.fetch_all(query=GET_BOOK_HISTORIES_QUERY, values={"book_id": book_id})
+    async def borrow_books(
+        self, *, book_ids: List[int], borrowing_date: datetime.datetime
+    ) -> Dict[int, Optional[HistoryResponse]]:
+        """
+        Open loans for all available books at once. Unknown ids are left out of
+        the result and books already on loan map to None.
+        """
+        rows = await self.db.fetch_all(
+            query=BORROW_BOOKS_QUERY,
+            values={"book_ids": book_ids, "borrowing_date": borrowing_date},
+        )
+        return _loan_outcomes(rows)
+
+    async def return_books(
+        self, *, book_ids: List[int], returning_date: datetime.datetime
+    ) -> Dict[int, Optional[HistoryResponse]]:
+        """
+        Close the open loans of all given books at once. Unknown ids are left
+        out of the result and books without an open loan map to None.
+        """
+        rows = await self.db.fetch_all(
+            query=RETURN_BOOKS_QUERY,
+            values={"book_ids": book_ids, "returning_date": returning_date},
+        )
+        return _loan_outcomes(rows)
+
+    @coalesce
+    async def get_borrow_history(
+        self,
+        *,
+        book_id: int,
+        limit: int,
+        before: Optional[Tuple[datetime.datetime, int]] = None,
+        borrowed_from: Optional[datetime.datetime] = None,
+        borrowed_to: Optional[datetime.datetime] = None,
+    ) -> Optional[List[HistoryInDB]]:
+        """
+        Return one page of a book's histories, newest first. `before` is the
+        (borrowing_date, id) of the last history on the previous page.
+        """
+        conditions = []
+        query_value = {"book_id": book_id, "limit": limit}
+        if before:
+            conditions.append("(borrowing_date, id) < (:before_date, :before_id)")
+            query_value["before_date"], query_value["before_id"] = before
+        if borrowed_from:
+            conditions.append("borrowing_date >= :borrowed_from")
+            query_value["borrowed_from"] = borrowed_from
+        if borrowed_to:
+            conditions.append("borrowing_date < :borrowed_to")
+            query_value["borrowed_to"] = borrowed_to
+        histories = await self.read_db.fetch_all(
+            query=GET_BOOK_HISTORIES_QUERY.format(
+                conditions="".join(f" AND {condition}" for condition in conditions)
+            ),
+            values=query_value,
+        )
         if not histories:
             return None
-        return [HistoryResponse(**history) for history in histories]
+        return [HistoryInDB(**history) for history in histories]
+
+    async def iterate_histories(
+        self, *, after_id: int = 0
+    ) -> AsyncIterator[HistoryInDB]:
+        """Stream every history from a server-side cursor, ordered by id."""
+        async for history in self.db.iterate(
+            query=EXPORT_HISTORIES_QUERY, values={"after_id": after_id}
+        ):
+            yield HistoryInDB(**history)
+
+
+def _loan_outcomes(rows: List[Mapping]) -> Dict[int, Optional[HistoryResponse]]:
+    return {
+        row["book_id"]: HistoryResponse(
+            borrowing_date=row["borrowing_date"], returning_date=row["returning_date"]
+        )
+        if row["borrowing_date"]
+        else None
+        for row in rows
+        if row["book_exists"]
+    }
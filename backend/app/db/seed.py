@@ -0,0 +1,91 @@
+"""
+Seed the books table from a local JSON array or NDJSON fixture.
+
+    python -m app.db.seed
+    python -m app.db.seed path/to/books.ndjson --force
+
+Seeding is skipped when the table already has books, unless --force is given.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import pathlib
+import time
+from typing import Iterator, List
+
+from databases import Database
+
+from ..core.config import BULK_INSERT_BATCH_SIZE, DATABASE_URL
+from ..models.book import BookCreate
+from .repositories.books import BookRepository
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURE = pathlib.Path(__file__).with_name("fixtures") / "books.ndjson"
+
+HAS_BOOKS_QUERY = "SELECT EXISTS (SELECT 1 FROM books);"
+
+
+def read_fixture(path: pathlib.Path) -> Iterator[BookCreate]:
+    """Yield books from a JSON array, or line by line from an NDJSON file."""
+    with path.open(encoding="utf-8") as fixture:
+        if path.suffix == ".json":
+            yield from (BookCreate(**book) for book in json.load(fixture))
+            return
+        for line in fixture:
+            if line.strip():
+                yield BookCreate.parse_raw(line)
+
+
+async def seed_books(
+    db: Database,
+    path: pathlib.Path = DEFAULT_FIXTURE,
+    *,
+    batch_size: int = BULK_INSERT_BATCH_SIZE,
+    force: bool = False,
+) -> int:
+    """Insert the fixture's books in batches and return how many were created."""
+    if not force and await db.fetch_val(HAS_BOOKS_QUERY):
+        return 0
+    book_repo = BookRepository(db)
+    created = 0
+    batch: List[BookCreate] = []
+    for book in read_fixture(path):
+        batch.append(book)
+        if len(batch) == batch_size:
+            created += await _insert(book_repo, batch)
+            batch = []
+    if batch:
+        created += await _insert(book_repo, batch)
+    return created
+
+
+async def _insert(book_repo: BookRepository, batch: List[BookCreate]) -> int:
+    created_books = await book_repo.create_books(new_books=batch, batch_size=len(batch))
+    return sum(book is not None for book in created_books)
+
+
+async def main(path: pathlib.Path, batch_size: int, force: bool) -> None:
+    db_url = f"{DATABASE_URL}_test" if os.environ.get("TESTING") else DATABASE_URL
+    start = time.perf_counter()
+    async with Database(str(db_url)) as db:
+        created = await seed_books(db, path, batch_size=batch_size, force=force)
+    logger.info(
+        "Seeded %d books from %s in %.2fs", created, path, time.perf_counter() - start
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "fixture", nargs="?", type=pathlib.Path, default=DEFAULT_FIXTURE
+    )
+    parser.add_argument("--batch-size", type=int, default=BULK_INSERT_BATCH_SIZE)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.fixture, args.batch_size, args.force))
@@ -0,0 +1,123 @@
+import asyncio
+import contextvars
+import datetime
+import json
+import logging
+import random
+import re
+import time
+from collections import deque
+from typing import Any, Deque, List, Optional, Set
+
+from databases import Database
+
+from ..models.slow_query import SlowQuery
+
+logger = logging.getLogger(__name__)
+
+
+class SlowQueryLog:
+    """
+    Keeps the most recent queries slower than `threshold` seconds and attaches
+    an EXPLAIN plan captured in the background. Plans are sampled and limited
+    to `explains_per_minute` so capturing them cannot pile load onto the
+    database while it is already slow.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float,
+        sample_rate: float,
+        explains_per_minute: int,
+        max_entries: int,
+    ) -> None:
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.explains_per_minute = explains_per_minute
+        self._entries: Deque[SlowQuery] = deque(maxlen=max_entries)
+        self._explained_at: Deque[float] = deque()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def entries(self) -> List[SlowQuery]:
+        return list(reversed(self._entries))
+
+    def record(
+        self,
+        db: Database,
+        *,
+        query_name: str,
+        caller: str,
+        query: Any,
+        values: Optional[dict],
+        duration: float,
+    ) -> None:
+        values = values or {}
+        entry = SlowQuery(
+            query_name=query_name,
+            caller=caller,
+            query=str(query),
+            params={key: type(value).__name__ for key, value in values.items()},
+            duration_ms=duration * 1000,
+            recorded_at=datetime.datetime.utcnow(),
+        )
+        self._entries.append(entry)
+        logger.warning(
+            "Slow query %s from %s took %.1fms with params %s",
+            entry.query_name,
+            entry.caller,
+            entry.duration_ms,
+            entry.params,
+        )
+        if self._should_explain():
+            # Start from an empty context so `databases` hands the EXPLAIN its
+            # own connection instead of the caller's, which may be inside a
+            # transaction.
+            task = contextvars.Context().run(
+                asyncio.create_task, self._explain(db, entry, query, values)
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def cancel_pending(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+    def _should_explain(self) -> bool:
+        if self._tasks or random.random() >= self.sample_rate:
+            return False
+        now = time.monotonic()
+        while self._explained_at and now - self._explained_at[0] > 60:
+            self._explained_at.popleft()
+        if len(self._explained_at) >= self.explains_per_minute:
+            return False
+        self._explained_at.append(now)
+        return True
+
+    async def _explain(
+        self, db: Database, entry: SlowQuery, query: Any, values: Optional[dict]
+    ) -> None:
+        # ANALYZE executes the statement again, so only do that for reads.
+        options = "ANALYZE, BUFFERS, " if _is_read_only(str(query)) else ""
+        try:
+            # Even a SELECT can call functions that write, so always roll back
+            # whatever the analyzed statement did.
+            async with db.transaction(force_rollback=True):
+                # Call the base implementation so the EXPLAIN is not itself
+                # timed and logged as a slow query.
+                plan = await Database.fetch_val(
+                    db, query=f"EXPLAIN ({options}FORMAT JSON) {query}", values=values
+                )
+        except Exception as e:
+            logger.warning("Could not EXPLAIN slow query %s: %s", entry.query_name, e)
+            return
+        entry.plan = json.loads(plan) if isinstance(plan, str) else plan
+
+
+def _is_read_only(query: str) -> bool:
+    return bool(_READ_QUERY.match(query)) and not _WRITE_KEYWORD.search(query)
+
+
+_READ_QUERY = re.compile(r"\s*\(?\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITE_KEYWORD = re.compile(r"\b(INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
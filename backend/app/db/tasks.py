@@ -1,17 +1,52 @@
 import logging
 import os
 
-from databases import Database
 from fastapi import FastAPI
 
-from ..core.config import DATABASE_URL
+from ..core.config import (
+    DATABASE_REPLICA_URL,
+    DATABASE_URL,
+    DB_POOL_MAX_INACTIVE_LIFETIME,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_TIMEOUT,
+    REPLICA_RETRY_SECONDS,
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    SLOW_QUERY_EXPLAINS_PER_MINUTE,
+    SLOW_QUERY_LOG_SIZE,
+    SLOW_QUERY_THRESHOLD_MS,
+)
+from .events import EventNotifier
+from .instrumentation import InstrumentedDatabase, ReplicaDatabase
+from .slow_queries import SlowQueryLog
 
 logger = logging.getLogger(__name__)
 
+POOL_OPTIONS = {
+    "min_size": DB_POOL_MIN_SIZE,
+    "max_size": DB_POOL_MAX_SIZE,
+    "max_inactive_connection_lifetime": DB_POOL_MAX_INACTIVE_LIFETIME,
+}
+
 
 async def connect_to_db(app: FastAPI) -> None:
+    app.state._read_db = None
     db_url = f"{DATABASE_URL}_test" if os.environ.get("TESTING") else DATABASE_URL
-    database = Database(db_url, min_size=2, max_size=10)
+    slow_query_log = None
+    if SLOW_QUERY_THRESHOLD_MS > 0:
+        slow_query_log = SlowQueryLog(
+            threshold=SLOW_QUERY_THRESHOLD_MS / 1000,
+            sample_rate=SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+            explains_per_minute=SLOW_QUERY_EXPLAINS_PER_MINUTE,
+            max_entries=SLOW_QUERY_LOG_SIZE,
+        )
+    app.state._event_notifier = EventNotifier(str(db_url))
+    database = InstrumentedDatabase(
+        db_url,
+        slow_query_log=slow_query_log,
+        pool_timeout=DB_POOL_TIMEOUT,
+        **POOL_OPTIONS,
+    )
     try:
         await database.connect()
         app.state._db = database
@@ -19,10 +54,36 @@ async def connect_to_db(app: FastAPI) -> None:
         logger.warning("--- DB CONNECTION ERROR ---")
         logger.warning(e)
         logger.warning("--- DB CONNECTION ERROR ---")
+        return
+    await app.state._event_notifier.start()
+
+    if DATABASE_REPLICA_URL:
+        replica_url = (
+            f"{DATABASE_REPLICA_URL}_test"
+            if os.environ.get("TESTING")
+            else DATABASE_REPLICA_URL
+        )
+        replica = ReplicaDatabase(
+            replica_url,
+            primary=database,
+            retry_after=REPLICA_RETRY_SECONDS,
+            slow_query_log=slow_query_log,
+            pool_timeout=DB_POOL_TIMEOUT,
+            **POOL_OPTIONS,
+        )
+        try:
+            await replica.connect()
+            app.state._read_db = replica
+        except Exception as e:
+            logger.warning("--- DB REPLICA CONNECTION ERROR, READING FROM PRIMARY ---")
+            logger.warning(e)
 
 
 async def close_db_connection(app: FastAPI) -> None:
     try:
+        await app.state._event_notifier.stop()
+        if app.state._read_db is not None:
+            await app.state._read_db.disconnect()
         await app.state._db.disconnect()
     except Exception as e:
         logger.warning("--- DB DISCONNECT ERROR ---")
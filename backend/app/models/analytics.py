@@ -0,0 +1,32 @@
+import datetime
+from typing import Dict, Optional
+
+from ..models.core import CoreModel
+
+
+class BookLoanStats(CoreModel):
+    book_id: int
+    title: str
+    loan_count: int
+    returned_count: int
+    open_loan: bool
+    total_loan_seconds: float
+    last_loan_seconds: Optional[float]
+    mean_loan_seconds: Optional[float]
+    last_borrowing_date: Optional[datetime.datetime]
+
+
+class Utilization(CoreModel):
+    books: int
+    borrowed: int
+    utilization: float
+
+
+class CategoryMeanLoanDurations(CoreModel):
+    category: str
+    books: int
+    loans: int
+    # Percentiles across the category's books of each book's mean loan
+    # duration in seconds, keyed by the requested fraction, e.g. {"0.5": 3600.0}.
+    # They are not percentiles of individual loans.
+    mean_loan_seconds_percentiles: Dict[str, float]
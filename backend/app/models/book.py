@@ -1,16 +1,24 @@
-from typing import Optional, List
+from functools import lru_cache
+from typing import Dict, Optional, List, Tuple, Type
+
+from pydantic import conint, constr, create_model
 
 from ..models.core import CoreModel, ResponseModelMixin
 
 
+# Limits of the books columns, checked up front so a bad item in a multi-row
+# INSERT is reported on its own instead of failing the whole statement.
+INT4_MAX = 2**31 - 1
+
+
 class BaseBook(CoreModel):
-    isbn10: Optional[str]
-    isbn13: Optional[str]
+    isbn10: Optional[constr(max_length=10)]
+    isbn13: Optional[constr(max_length=13)]
     title: Optional[str]
     description: Optional[str]
     authors: Optional[List[str]]
     categories: Optional[List[str]]
-    page_count: Optional[int]
+    page_count: Optional[conint(ge=0, le=INT4_MAX)]
     published_date: Optional[str]
 
 
@@ -23,4 +31,71 @@ class BookUpdate(BaseBook):
 
 
 class BookResponse(BaseBook, ResponseModelMixin):
-    pass
+    version: int
+
+
+class BookWithAvailability(BookResponse):
+    available: bool
+
+
+class BookPartialResponse(BaseBook, ResponseModelMixin):
+    """
+    Book reduced to the fields selected with `fields=`. id and version are
+    always present; fields that were not selected are left out.
+    """
+
+    version: int
+    available: Optional[bool]
+
+
+class BookAvailability(CoreModel):
+    book_id: int
+    available: bool
+
+
+# Fields a client may select with `fields=`; id and version are always included.
+BOOK_FIELDS = tuple(BookWithAvailability.__fields__)
+
+
+@lru_cache(maxsize=None)
+def book_projection(fields: Tuple[str, ...]) -> Type[CoreModel]:
+    """
+    Return a model with only `fields` of BookWithAvailability, built once per
+    field set.
+    """
+    return create_model(
+        "BookProjection",
+        __base__=CoreModel,
+        **{
+            name: (field.outer_type_, ... if field.required else field.default)
+            for name, field in BookWithAvailability.__fields__.items()
+            if name in fields
+        },
+    )
+
+
+class BookBulkResult(CoreModel):
+    index: int
+    book: Optional[BookResponse]
+    error: Optional[str]
+
+
+class BookBulkResponse(CoreModel):
+    created: int
+    failed: int
+    results: List[BookBulkResult]
+
+
+class BookSearchResult(BookResponse):
+    rank: Optional[float]
+
+
+class FacetCount(CoreModel):
+    value: str
+    count: int
+
+
+class BookSearchResponse(CoreModel):
+    total: int
+    books: List[BookSearchResult]
+    facets: Dict[str, List[FacetCount]]
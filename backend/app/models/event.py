@@ -0,0 +1,17 @@
+import datetime
+from typing import List, Optional
+
+from ..models.core import CoreModel
+
+
+class BookEvent(CoreModel):
+    seq: int
+    book_id: int
+    type: str
+    version: Optional[int]
+    created_at: datetime.datetime
+
+
+class BookEventPage(CoreModel):
+    events: List[BookEvent]
+    last_seq: int
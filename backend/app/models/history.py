@@ -1,5 +1,5 @@
 import datetime
-from typing import Optional
+from typing import List, Optional
 
 from ..models.core import CoreModel
 
@@ -14,12 +14,23 @@ class BorrowingHistory(BaseHistory):
     borrowing_date: datetime.datetime
 
 
-class ReturningHistory(BaseHistory):
+class HistoryResponse(BaseHistory):
+    pass
+
+
+class HistoryInDB(BaseHistory):
     id: int
     book_id: int
     borrowing_date: datetime.datetime
-    returning_date: datetime.datetime
 
 
-class HistoryResponse(BaseHistory):
-    pass
+class BookLoanResult(CoreModel):
+    book_id: int
+    history: Optional[HistoryResponse]
+    error: Optional[str]
+
+
+class BookLoanResponse(CoreModel):
+    succeeded: int
+    failed: int
+    results: List[BookLoanResult]
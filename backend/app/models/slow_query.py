@@ -0,0 +1,14 @@
+import datetime
+from typing import Any, Dict, Optional
+
+from ..models.core import CoreModel
+
+
+class SlowQuery(CoreModel):
+    query_name: str
+    caller: str
+    query: str
+    params: Dict[str, str]
+    duration_ms: float
+    recorded_at: datetime.datetime
+    plan: Optional[Any]
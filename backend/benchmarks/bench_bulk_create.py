@@ -0,0 +1,66 @@
+"""
+Compare single-row book creation with the bulk multi-row INSERT path.
+
+Run from the backend directory against a disposable database:
+
+    python -m benchmarks.bench_bulk_create --count 5000
+"""
+import argparse
+import asyncio
+import time
+
+from databases import Database
+
+from app.core.config import BULK_INSERT_BATCH_SIZE, DATABASE_URL
+from app.db.repositories.books import BookRepository
+from app.models.book import BookCreate
+
+TITLE_PREFIX = "benchmark book"
+DELETE_BENCHMARK_BOOKS_QUERY = f"DELETE FROM books WHERE title LIKE '{TITLE_PREFIX} %';"
+
+
+def make_books(count: int, label: str):
+    return [
+        BookCreate(
+            title=f"{TITLE_PREFIX} {label} {index}",
+            description="benchmark description " * 10,
+            authors=["Benchmark Author"],
+            categories=["Benchmark"],
+            page_count=index,
+            published_date="2022-01-01",
+        )
+        for index in range(count)
+    ]
+
+
+async def run(count: int, batch_size: int) -> None:
+    db = Database(str(DATABASE_URL))
+    await db.connect()
+    book_repo = BookRepository(db)
+    try:
+        start = time.perf_counter()
+        for new_book in make_books(count, "single"):
+            await book_repo.create_book(new_book=new_book)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await book_repo.create_books(
+            new_books=make_books(count, "bulk"), batch_size=batch_size
+        )
+        bulk = time.perf_counter() - start
+    finally:
+        await db.execute(DELETE_BENCHMARK_BOOKS_QUERY)
+        await db.disconnect()
+
+    print(f"books: {count}, batch size: {batch_size}")
+    print(f"single-row: {single:.3f}s ({count / single:,.0f} rows/s)")
+    print(f"bulk:       {bulk:.3f}s ({count / bulk:,.0f} rows/s)")
+    print(f"speedup:    {single / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=BULK_INSERT_BATCH_SIZE)
+    args = parser.parse_args()
+    asyncio.run(run(args.count, args.batch_size))
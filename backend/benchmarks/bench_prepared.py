@@ -0,0 +1,56 @@
+"""
+Compare the per-call overhead of GET_BOOK_BY_ID_QUERY run as a plain string
+through `databases` with the PreparedQuery path of InstrumentedDatabase.
+
+Run from the backend directory against a database with at least one book:
+
+    python -m benchmarks.bench_prepared --count 10000
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.config import DATABASE_URL
+from app.db.instrumentation import InstrumentedDatabase
+from app.db.repositories.books import GET_BOOK_BY_ID_QUERY
+from app.models.book import BookResponse
+
+GET_FIRST_BOOK_ID_QUERY = "SELECT min(id) FROM books;"
+
+
+async def run(count: int) -> None:
+    db = InstrumentedDatabase(str(DATABASE_URL), min_size=1, max_size=1)
+    await db.connect()
+    try:
+        values = {"id": await db.fetch_val(GET_FIRST_BOOK_ID_QUERY)}
+        # Hold one connection so both paths measure query overhead, not pool
+        # checkouts, and warm up asyncpg's statement cache for both.
+        async with db.connection():
+            plain_query = str(GET_BOOK_BY_ID_QUERY)
+            await db.fetch_one(plain_query, values)
+            await db.fetch_one(GET_BOOK_BY_ID_QUERY, values)
+
+            start = time.perf_counter()
+            for _ in range(count):
+                BookResponse(**await db.fetch_one(plain_query, values))
+            plain = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(count):
+                row = await db.fetch_one(GET_BOOK_BY_ID_QUERY, values)
+                BookResponse.construct(**row)
+            prepared = time.perf_counter() - start
+    finally:
+        await db.disconnect()
+
+    print(f"calls: {count}")
+    print(f"databases: {plain / count * 1e6:.1f}us/call")
+    print(f"prepared:  {prepared / count * 1e6:.1f}us/call")
+    print(f"speedup:   {plain / prepared:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10000)
+    args = parser.parse_args()
+    asyncio.run(run(args.count))
@@ -0,0 +1,68 @@
+"""
+Compare the CPU time FastAPI spends validating and encoding a page of books
+through `response_model` with rendering it directly with ModelJSONResponse.
+
+Needs no database:
+
+    python -m benchmarks.bench_serialization --page-size 100 --requests 1000
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.api.responses import ModelJSONResponse
+from app.models.book import BookResponse
+
+
+def make_books(count: int) -> List[BookResponse]:
+    return [
+        BookResponse.construct(
+            id=index,
+            isbn10=None,
+            isbn13=None,
+            title=f"benchmark book {index}",
+            description="benchmark description " * 50,
+            authors=["Benchmark Author"],
+            categories=["Benchmark"],
+            page_count=index,
+            published_date="2022-01-01",
+            version=1,
+        )
+        for index in range(count)
+    ]
+
+
+async def run(page_size: int, requests: int) -> None:
+    books = make_books(page_size)
+    field = create_response_field(name="response", type_=List[BookResponse])
+
+    start = time.process_time()
+    for _ in range(requests):
+        content = await serialize_response(field=field, response_content=books)
+        JSONResponse(content)
+    response_model = time.process_time() - start
+
+    start = time.process_time()
+    for _ in range(requests):
+        ModelJSONResponse(books)
+    direct = time.process_time() - start
+
+    print(f"page size: {page_size}, requests: {requests}")
+    print(f"response_model: {response_model / requests * 1e3:.3f}ms CPU/request")
+    print(f"orjson direct:  {direct / requests * 1e3:.3f}ms CPU/request")
+    print(f"saved:          {(response_model - direct) / requests * 1e3:.3f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.page_size, args.requests))
@@ -0,0 +1,303 @@
+"""
+Load-test the books API and compare the results with a stored baseline.
+
+Seed a local database, then drive a running server (e.g. `docker compose up`):
+
+    python -m benchmarks.loadtest seed --books 10000 --histories 1000000
+    python -m benchmarks.loadtest run --concurrency 1,10,50 --save-baseline
+    python -m benchmarks.loadtest run --concurrency 1,10,50
+    python -m benchmarks.loadtest cleanup
+
+`run` prints throughput and p50/p95/p99 latency per request type and
+concurrency level as JSON, and exits with status 1 when a result regresses past
+--threshold against the baseline file, fails more than --max-error-rate of its
+requests, or is missing for a request type and concurrency level in the baseline.
+"""
+import argparse
+import asyncio
+import json
+import pathlib
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from databases import Database
+
+from app.core.config import DATABASE_URL
+
+TITLE_PREFIX = "loadtest book"
+DEFAULT_BASELINE = pathlib.Path(__file__).with_name("baseline.json")
+
+SEED_BOOKS_QUERY = f"""
+INSERT INTO books (title, description, authors, categories, page_count, published_date)
+SELECT '{TITLE_PREFIX} ' || i,
+       repeat('load test description ', 20),
+       ARRAY['Load Test Author ' || (i % 500)],
+       ARRAY['Load Test Category ' || (i % 50)],
+       i % 1000,
+       '2022-01-01'
+FROM generate_series(1, CAST(:books AS integer)) AS i;
+"""
+
+# Spread closed loans over the seeded books, newest first, one minute apart.
+SEED_HISTORIES_QUERY = f"""
+WITH seeded AS (
+  SELECT array_agg(id) AS ids FROM books WHERE title LIKE '{TITLE_PREFIX} %'
+)
+INSERT INTO histories (book_id, borrowing_date, returning_date)
+SELECT ids[1 + i % array_length(ids, 1)],
+       now() - i * interval '1 minute',
+       now() - i * interval '1 minute' + interval '30 seconds'
+FROM seeded, generate_series(1, CAST(:histories AS integer)) AS i;
+"""
+
+GET_SEEDED_BOOK_IDS_QUERY = f"""
+SELECT id FROM books WHERE title LIKE '{TITLE_PREFIX} %' ORDER BY id;
+"""
+
+DELETE_SEEDED_HISTORIES_QUERY = f"""
+DELETE FROM histories
+WHERE book_id IN (SELECT id FROM books WHERE title LIKE '{TITLE_PREFIX} %');
+"""
+
+DELETE_SEEDED_BOOKS_QUERY = f"""
+DELETE FROM books WHERE title LIKE '{TITLE_PREFIX} %';
+"""
+
+# A step is (result name, method, url, request kwargs); a scenario returns the
+# steps for the i-th iteration of a worker, which are timed one by one.
+Step = Tuple[str, str, str, dict]
+Scenario = Callable[[int, int], List[Step]]
+
+
+def scenarios(book_ids: Sequence[int], concurrency: int) -> Dict[str, Scenario]:
+    def create_book(worker: int, i: int) -> List[Step]:
+        new_book = {"title": f"{TITLE_PREFIX} created {worker}-{i}-{time.time_ns()}"}
+        return [("create_book", "POST", "/books/", {"json": {"new_book": new_book}})]
+
+    def get_books(worker: int, i: int) -> List[Step]:
+        offset = random.randrange(max(len(book_ids) - 10, 1))
+        params = {"limit": 10, "offset": offset}
+        return [("get_books", "GET", "/books/", {"params": params})]
+
+    def get_book_by_id(worker: int, i: int) -> List[Step]:
+        return [("get_book_by_id", "GET", f"/books/{random.choice(book_ids)}", {})]
+
+    def burrow_and_return_book(worker: int, i: int) -> List[Step]:
+        # Each worker owns a disjoint slice of books so loans never collide.
+        owned = book_ids[worker::concurrency]
+        book_id = owned[i % len(owned)]
+        return [
+            ("burrow_book", "POST", f"/books/{book_id}/burrow", {}),
+            ("return_book", "POST", f"/books/{book_id}/return", {}),
+        ]
+
+    def get_burrow_history(worker: int, i: int) -> List[Step]:
+        url = f"/books/{random.choice(book_ids)}/burrow-history"
+        return [("get_burrow_history", "GET", url, {})]
+
+    return {
+        "create_book": create_book,
+        "get_books": get_books,
+        "get_book_by_id": get_book_by_id,
+        "burrow_and_return_book": burrow_and_return_book,
+        "get_burrow_history": get_burrow_history,
+    }
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[round(fraction * (len(sorted_values) - 1))]
+
+
+async def drive(
+    base_url: str, scenario: Scenario, concurrency: int, duration: float
+) -> Dict[str, dict]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: httpx.AsyncClient, worker: int) -> None:
+        i = 0
+        while time.perf_counter() < deadline:
+            for name, method, url, kwargs in scenario(worker, i):
+                start = time.perf_counter()
+                response = await client.request(method, url, **kwargs)
+                if response.is_error:
+                    errors[name] += 1
+                else:
+                    latencies[name].append(time.perf_counter() - start)
+            i += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30)
+    async with client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    results = {}
+    for name in {*latencies, *errors}:
+        values = sorted(latencies[name])
+        requests = len(values) + errors[name]
+        results[name] = {
+            "requests": len(values),
+            "errors": errors[name],
+            "error_rate": round(errors[name] / requests, 4),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        }
+    return results
+
+
+def regressions(
+    results: dict, baseline: dict, threshold: float, max_error_rate: float
+) -> List[str]:
+    found = []
+    for name, levels in results.items():
+        for concurrency, result in levels.items():
+            label = f"{name} @ {concurrency}"
+            if result["error_rate"] > max_error_rate:
+                found.append(
+                    f"{label}: error rate {result['error_rate']} > {max_error_rate}"
+                )
+    for name, levels in baseline.items():
+        for concurrency, expected in levels.items():
+            label = f"{name} @ {concurrency}"
+            result = results.get(name, {}).get(concurrency)
+            if not result:
+                found.append(f"{label}: missing from the results")
+                continue
+            if result["p95_ms"] > expected["p95_ms"] * (1 + threshold):
+                found.append(
+                    f"{label}: p95 {result['p95_ms']}ms > {expected['p95_ms']}ms"
+                )
+            if result["throughput_rps"] < expected["throughput_rps"] * (1 - threshold):
+                found.append(
+                    f"{label}: throughput {result['throughput_rps']}rps "
+                    f"< {expected['throughput_rps']}rps"
+                )
+    return found
+
+
+async def seed(books: int, histories: int) -> None:
+    db = Database(str(DATABASE_URL))
+    await db.connect()
+    try:
+        start = time.perf_counter()
+        await db.execute(query=SEED_BOOKS_QUERY, values={"books": books})
+        await db.execute(query=SEED_HISTORIES_QUERY, values={"histories": histories})
+        await db.execute("ANALYZE books")
+        await db.execute("ANALYZE histories")
+    finally:
+        await db.disconnect()
+    print(
+        f"seeded {books} books and {histories} histories "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+async def cleanup() -> None:
+    db = Database(str(DATABASE_URL))
+    await db.connect()
+    try:
+        await db.execute(DELETE_SEEDED_HISTORIES_QUERY)
+        await db.execute(DELETE_SEEDED_BOOKS_QUERY)
+    finally:
+        await db.disconnect()
+
+
+async def run(
+    base_url: str,
+    concurrency_levels: List[int],
+    duration: float,
+    only: Optional[List[str]],
+) -> dict:
+    db = Database(str(DATABASE_URL))
+    await db.connect()
+    try:
+        book_ids = [row["id"] for row in await db.fetch_all(GET_SEEDED_BOOK_IDS_QUERY)]
+    finally:
+        await db.disconnect()
+    if len(book_ids) < max(concurrency_levels):
+        sys.exit("Seed at least as many books as the highest concurrency level.")
+
+    results: Dict[str, Dict[str, dict]] = {}
+    for concurrency in concurrency_levels:
+        for name, scenario in scenarios(book_ids, concurrency).items():
+            if only and name not in only:
+                continue
+            step_results = await drive(base_url, scenario, concurrency, duration)
+            for step, result in step_results.items():
+                results.setdefault(step, {})[str(concurrency)] = result
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="Seed books and histories.")
+    seed_parser.add_argument("--books", type=int, default=10000)
+    seed_parser.add_argument("--histories", type=int, default=1000000)
+
+    commands.add_parser("cleanup", help="Delete seeded and created load-test rows.")
+
+    run_parser = commands.add_parser("run", help="Drive the API and report results.")
+    run_parser.add_argument("--base-url", default="http://localhost:8000/api")
+    run_parser.add_argument("--concurrency", default="1,10,50")
+    run_parser.add_argument("--duration", type=float, default=10, help="Seconds.")
+    run_parser.add_argument("--scenario", action="append", dest="scenarios")
+    run_parser.add_argument("--baseline", type=pathlib.Path, default=DEFAULT_BASELINE)
+    run_parser.add_argument("--save-baseline", action="store_true")
+    run_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed relative regression of p95 latency and throughput.",
+    )
+    run_parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=0.01,
+        help="Allowed fraction of failed requests per request type.",
+    )
+    run_parser.add_argument("--output", type=pathlib.Path)
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        asyncio.run(seed(args.books, args.histories))
+        return
+    if args.command == "cleanup":
+        asyncio.run(cleanup())
+        return
+
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+    results = asyncio.run(
+        run(args.base_url, concurrency_levels, args.duration, args.scenarios)
+    )
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report)
+    if args.save_baseline:
+        args.baseline.write_text(report)
+        return
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        found = regressions(results, baseline, args.threshold, args.max_error_rate)
+        if found:
+            print("\n".join(["Regressions against baseline:", *found]), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import warnings
 
@@ -5,7 +6,9 @@ import alembic
 import pytest
 import pytest_asyncio
 from alembic.config import Config
+from app.core.config import DATABASE_URL
 from app.db.repositories.books import BookRepository
+from app.db.seed import seed_books
 from app.models.book import BookCreate, BookResponse, BookUpdate
 from asgi_lifespan import LifespanManager
 from databases import Database
@@ -13,12 +16,19 @@ from fastapi import FastAPI
 from httpx import AsyncClient
 
 
+async def seed_database() -> None:
+    async with Database(f"{DATABASE_URL}_test") as db:
+        await seed_books(db)
+
+
 @pytest.fixture(scope="session")
 def apply_migrations():
     warnings.filterwarnings("ignore", category=DeprecationWarning)
     os.environ["TESTING"] = "1"
     config = Config("alembic.ini")
     alembic.command.upgrade(config, "head")
+    # Tests rely on the 10 fixture books taking ids 1 to 10.
+    asyncio.run(seed_database())
     yield
     alembic.command.downgrade(config, "base")
 
@@ -82,3 +92,9 @@ def update_data():
         title="new test book",
         page_count=500,
     )
+
+
+@pytest.fixture
+async def available_book(db: Database) -> BookResponse:
+    book_repo = BookRepository(db)
+    return await book_repo.create_book(new_book=BookCreate(title="available book"))
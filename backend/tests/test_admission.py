@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+from app.api.middleware import AdmissionMiddleware
+from app.core.admission import (
+    MIN_CHECKOUT_TIMEOUT,
+    REQUEST_DEADLINE,
+    AdmissionLane,
+    Overloaded,
+    checkout_timeout,
+)
+from databases import Database
+from httpx import AsyncClient
+from starlette import status
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestAdmissionLane:
+    async def test_full_queue_is_rejected_immediately(self) -> None:
+        lane = AdmissionLane("test", limit=1, queue_size=0)
+        await lane.acquire(timeout=1)
+        with pytest.raises(Overloaded):
+            await lane.acquire(timeout=1)
+        lane.release()
+        await lane.acquire(timeout=1)
+
+    async def test_queued_request_fails_at_its_deadline(self) -> None:
+        lane = AdmissionLane("test", limit=1, queue_size=1)
+        await lane.acquire(timeout=1)
+        with pytest.raises(Overloaded):
+            await lane.acquire(timeout=0.01)
+        assert lane.waiting == 0
+
+    async def test_queued_request_is_admitted_on_release(self) -> None:
+        lane = AdmissionLane("test", limit=1, queue_size=1)
+        await lane.acquire(timeout=1)
+        waiter = asyncio.ensure_future(lane.acquire(timeout=1))
+        await asyncio.sleep(0)
+        lane.release()
+        await waiter
+
+
+class TestAdmissionMiddleware:
+    async def test_saturated_lane_returns_503_with_retry_after(self) -> None:
+        release = asyncio.Event()
+
+        async def slow(request: Request) -> PlainTextResponse:
+            await release.wait()
+            return PlainTextResponse("done")
+
+        app = Starlette(routes=[Route("/", slow, methods=["GET", "POST"])])
+        app.add_middleware(
+            AdmissionMiddleware,
+            read_limit=1,
+            read_queue=0,
+            write_limit=1,
+            write_queue=0,
+            deadline=1,
+        )
+        async with AsyncClient(app=app, base_url="http://testserver") as client:
+            first = asyncio.ensure_future(client.get("/"))
+            await asyncio.sleep(0.01)
+            shed = await client.get("/")
+            # Writes are admitted separately from reads.
+            write = asyncio.ensure_future(client.post("/"))
+            await asyncio.sleep(0.01)
+            release.set()
+            assert (await first).status_code == status.HTTP_200_OK
+            assert (await write).status_code == status.HTTP_200_OK
+
+        assert shed.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert "Retry-After" in shed.headers
+
+
+class TestPoolCheckout:
+    async def test_idle_pool_serves_requests_past_their_deadline(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        token = REQUEST_DEADLINE.set(time.monotonic() - 1)
+        try:
+            assert checkout_timeout(5) == MIN_CHECKOUT_TIMEOUT
+            assert await db.fetch_val("SELECT 1") == 1
+        finally:
+            REQUEST_DEADLINE.reset(token)
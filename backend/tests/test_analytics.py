@@ -0,0 +1,105 @@
+import datetime
+
+import pytest
+from app.db.repositories.analytics import AnalyticsRepository
+from app.models.analytics import BookLoanStats, CategoryMeanLoanDurations, Utilization
+from databases import Database
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette import status
+
+pytestmark = pytest.mark.asyncio
+
+INSERT_HISTORY_QUERY = """
+INSERT INTO histories (book_id, borrowing_date, returning_date)
+VALUES (:book_id, :borrowing_date, :returning_date);
+"""
+
+
+async def get_book_stats(
+    analytics_repo: AnalyticsRepository, book_id: int
+) -> BookLoanStats:
+    books = await analytics_repo.get_most_borrowed_books(limit=100)
+    return next(stats for stats in books if stats.book_id == book_id)
+
+
+# These tests borrow the seeded fixture books rather than creating new ones, so
+# the books tests still see the ids they expect.
+class TestBookLoanStats:
+    async def test_trigger_maintains_stats(
+        self, app: FastAPI, client: AsyncClient, db: Database
+    ) -> None:
+        analytics_repo = AnalyticsRepository(db)
+        book_id = 7
+        borrowing_date = datetime.datetime(2022, 1, 1)
+        for hours in (1, 3):
+            await db.execute(
+                query=INSERT_HISTORY_QUERY,
+                values={
+                    "book_id": book_id,
+                    "borrowing_date": borrowing_date,
+                    "returning_date": borrowing_date + datetime.timedelta(hours=hours),
+                },
+            )
+        res = await client.post(app.url_path_for("books:burrow-book", id=book_id))
+        assert res.status_code == status.HTTP_200_OK
+
+        stats = await get_book_stats(analytics_repo, book_id)
+        assert stats.loan_count == 3
+        assert stats.returned_count == 2
+        assert stats.open_loan
+        assert stats.total_loan_seconds == 4 * 3600
+        assert stats.mean_loan_seconds == 2 * 3600
+
+        res = await client.post(app.url_path_for("books:return-book", id=book_id))
+        assert res.status_code == status.HTTP_200_OK
+        stats = await get_book_stats(analytics_repo, book_id)
+        assert stats.returned_count == 3
+        assert not stats.open_loan
+
+
+class TestAnalyticsRoutes:
+    async def test_most_borrowed(self, app: FastAPI, client: AsyncClient) -> None:
+        for _ in range(2):
+            await client.post(app.url_path_for("books:burrow-book", id=8))
+            await client.post(app.url_path_for("books:return-book", id=8))
+
+        res = await client.get(app.url_path_for("analytics:most-borrowed"))
+        assert res.status_code == status.HTTP_200_OK
+        stats = [BookLoanStats(**stats) for stats in res.json()]
+        assert stats == sorted(stats, key=lambda stats: -stats.loan_count)
+        assert 8 in {stats.book_id for stats in stats}
+
+    async def test_utilization(self, app: FastAPI, client: AsyncClient) -> None:
+        await client.post(app.url_path_for("books:burrow-book", id=9))
+
+        res = await client.get(app.url_path_for("analytics:utilization"))
+        assert res.status_code == status.HTTP_200_OK
+        utilization = Utilization(**res.json())
+        assert utilization.borrowed >= 1
+        assert utilization.utilization == utilization.borrowed / utilization.books
+
+        await client.post(app.url_path_for("books:return-book", id=9))
+
+    async def test_mean_loan_durations(self, app: FastAPI, client: AsyncClient) -> None:
+        await client.post(app.url_path_for("books:burrow-book", id=6))
+        await client.post(app.url_path_for("books:return-book", id=6))
+
+        res = await client.get(
+            app.url_path_for("analytics:mean-loan-durations"),
+            params={"percentiles": [0.5, 0.9]},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        durations = [CategoryMeanLoanDurations(**category) for category in res.json()]
+        category = next(
+            category for category in durations if category.category == "Science"
+        )
+        assert list(category.mean_loan_seconds_percentiles) == ["0.5", "0.9"]
+
+    async def test_invalid_percentiles_raise_error(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.get(
+            app.url_path_for("analytics:mean-loan-durations"), params={"percentiles": 2}
+        )
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
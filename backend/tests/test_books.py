@@ -1,5 +1,12 @@
+import asyncio
+
 import pytest
-from app.models.book import BookCreate, BookResponse, BookUpdate
+from app.api.dependencies.pagination import encode_cursor
+from app.api.routes import books as books_routes
+from app.db.repositories.books import BookRepository
+from app.models.book import BookAvailability, BookCreate, BookResponse, BookUpdate
+from app.models.history import BookLoanResponse
+from databases import Database
 from fastapi import FastAPI
 from httpx import AsyncClient
 from starlette import status
@@ -151,3 +158,535 @@ class TestDeleteBook:
     ) -> None:
         res = await client.delete(app.url_path_for("books:delete-book", id=id))
         assert res.status_code == status_code
+
+
+class TestGetBooks:
+    async def test_get_books_with_cursor(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.get(app.url_path_for("books:get-books"), params={"limit": 5})
+        assert res.status_code == status.HTTP_200_OK
+        first_page = [BookResponse(**book) for book in res.json()]
+        assert len(first_page) == 5
+        cursor = res.headers["X-Next-Cursor"]
+
+        res = await client.get(
+            app.url_path_for("books:get-books"), params={"limit": 5, "after": cursor}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        second_page = [BookResponse(**book) for book in res.json()]
+        assert second_page[0].id > first_page[-1].id
+
+        res = await client.get(
+            app.url_path_for("books:get-books"), params={"limit": 5, "offset": 5}
+        )
+        assert [BookResponse(**book) for book in res.json()] == second_page
+
+    async def test_pagination_headers(
+        self, app: FastAPI, client: AsyncClient, db: Database
+    ) -> None:
+        total = await db.fetch_val("SELECT count(*) FROM books;")
+        url = app.url_path_for("books:get-books")
+        res = await client.get(url, params={"limit": 5, "count": "exact"})
+        assert res.headers["X-Has-More"] == "true"
+        assert res.headers["X-Total-Count"] == str(total)
+
+        res = await client.get(url, params={"limit": 5, "offset": total - 1})
+        assert len(res.json()) == 1
+        assert res.headers["X-Has-More"] == "false"
+        assert "X-Next-Cursor" not in res.headers
+        assert int(res.headers["X-Total-Count"]) >= 0
+
+        res = await client.get(url, params={"limit": 5, "count": "none"})
+        assert "X-Total-Count" not in res.headers
+
+    async def test_cross_origin_clients_can_read_pagination_headers(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.get(
+            app.url_path_for("books:get-books"),
+            params={"limit": 5},
+            headers={"Origin": "https://example.com"},
+        )
+        assert "X-Next-Cursor" in res.headers
+        exposed = res.headers["Access-Control-Expose-Headers"].split(", ")
+        assert {"ETag", "X-Has-More", "X-Next-Cursor", "X-Total-Count"} <= set(exposed)
+
+    async def test_limit_is_capped(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(
+            app.url_path_for("books:get-books"), params={"limit": 100000}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert len(res.json()) <= 100
+
+    @pytest.mark.parametrize(
+        "params, status_code",
+        (
+            ({"after": "not-a-cursor"}, 400),
+            ({"limit": 0}, 422),
+            ({"offset": -1}, 422),
+            ({"count": "approximate"}, 422),
+            ({"fields": "title,secret"}, 400),
+        ),
+    )
+    async def test_invalid_params_raise_error(
+        self, app: FastAPI, client: AsyncClient, params: dict, status_code: int
+    ) -> None:
+        res = await client.get(app.url_path_for("books:get-books"), params=params)
+        assert res.status_code == status_code
+
+
+class TestBookFields:
+    async def test_get_book_by_id_fields(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        url = app.url_path_for("books:get-book-by-id", id=1)
+        full = await client.get(url)
+        res = await client.get(url, params={"fields": "title,isbn10"})
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json() == {
+            name: full.json()[name] for name in ("id", "isbn10", "title", "version")
+        }
+        etag = res.headers["ETag"]
+        assert etag != full.headers["ETag"]
+
+        res = await client.get(
+            url, params={"fields": "title,isbn10"}, headers={"If-None-Match": etag}
+        )
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+        res = await client.get(url, headers={"If-None-Match": etag})
+        assert res.status_code == status.HTTP_200_OK
+
+    async def test_openapi_documents_projections(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        paths = (await client.get(app.openapi_url)).json()["paths"]
+        book = paths[app.url_path_for("books:get-book-by-id", id="{id}")]
+        books = paths[app.url_path_for("books:get-books")]
+        schemas = [
+            book["get"]["responses"]["200"]["content"]["application/json"]["schema"],
+            books["get"]["responses"]["200"]["content"]["application/json"]["schema"][
+                "items"
+            ],
+        ]
+        for schema in schemas:
+            assert {ref["$ref"].rsplit("/", 1)[-1] for ref in schema["anyOf"]} == {
+                "BookResponse",
+                "BookPartialResponse",
+            }
+
+    async def test_get_books_fields(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(
+            app.url_path_for("books:get-books"), params={"fields": "title"}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert all(set(book) == {"id", "title", "version"} for book in res.json())
+
+
+class TestBookCache:
+    async def test_update_invalidates_cached_book(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.get(app.url_path_for("books:get-book-by-id", id=1))
+        assert res.status_code == status.HTTP_200_OK
+        res = await client.get(app.url_path_for("books:get-book-by-id", id=1))
+        assert app.state._cache.stats.hits == 1
+
+        res = await client.patch(
+            app.url_path_for("books:update-book", id=1),
+            json={"update_data": {"description": "cached description"}},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        res = await client.get(app.url_path_for("books:get-book-by-id", id=1))
+        assert BookResponse(**res.json()).description == "cached description"
+
+
+class TestCreateBooks:
+    async def test_create_books_reports_each_item(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        payload = [
+            {"title": "bulk book", "isbn10": "1111111111", "isbn13": "1111111111111"},
+            {"title": "bulk book duplicate", "isbn10": "1111111111"},
+            {"description": "missing title"},
+            {"title": "bulk book without isbn"},
+            {"title": "bulk book isbn13 duplicate", "isbn13": "1111111111111"},
+        ]
+        res = await client.post(app.url_path_for("books:create-books"), json=payload)
+        assert res.status_code == status.HTTP_200_OK
+        body = res.json()
+        assert (body["created"], body["failed"]) == (2, 3)
+        results = body["results"]
+        assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+        assert results[0]["book"]["title"] == "bulk book"
+        assert results[1]["book"] is None
+        assert results[1]["error"] == "A book with that isbn10 already exists."
+        assert results[2]["book"] is None and results[2]["error"]
+        assert results[3]["book"]["title"] == "bulk book without isbn"
+        assert results[4]["error"] == "A book with that isbn13 already exists."
+
+    async def test_column_limits_fail_only_their_items(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        payload = [
+            {"title": "bulk book within limits"},
+            {"title": "long isbn10", "isbn10": "12345678901"},
+            {"title": "long isbn13", "isbn13": "12345678901234"},
+            {"title": "too many pages", "page_count": 2**31},
+            {"title": "bulk book within limits too"},
+        ]
+        res = await client.post(app.url_path_for("books:create-books"), json=payload)
+        assert res.status_code == status.HTTP_200_OK
+        body = res.json()
+        assert (body["created"], body["failed"]) == (2, 3)
+        assert [bool(result["book"]) for result in body["results"]] == [
+            True,
+            False,
+            False,
+            False,
+            True,
+        ]
+        assert all(result["error"] for result in body["results"][1:4])
+
+    async def test_create_books_from_ndjson(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.post(
+            app.url_path_for("books:create-books"),
+            content=b'{"title": "ndjson book"}\nnot json\n',
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert (res.json()["created"], res.json()["failed"]) == (1, 1)
+
+    async def test_invalid_payload_raise_error(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.post(
+            app.url_path_for("books:create-books"), json={"title": "not a list"}
+        )
+        assert res.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    @pytest.mark.parametrize(
+        "limit, content, content_type",
+        (
+            ("BULK_MAX_ITEMS", b'[{"title": "a"}, {"title": "b"}]', "application/json"),
+            (
+                "BULK_MAX_ITEMS",
+                b'{"title": "a"}\n{"title": "b"}\n',
+                "application/x-ndjson",
+            ),
+            ("BULK_MAX_BODY_BYTES", b'[{"title": "a"}]', "application/json"),
+        ),
+    )
+    async def test_oversized_payload_raise_error(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        monkeypatch: pytest.MonkeyPatch,
+        limit: str,
+        content: bytes,
+        content_type: str,
+    ) -> None:
+        monkeypatch.setattr(books_routes, limit, 1 if limit == "BULK_MAX_ITEMS" else 8)
+        res = await client.post(
+            app.url_path_for("books:create-books"),
+            content=content,
+            headers={"Content-Type": content_type},
+        )
+        assert res.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+class TestBurrowBook:
+    async def test_burrow_and_return_book(
+        self, app: FastAPI, client: AsyncClient, available_book: BookResponse
+    ) -> None:
+        res = await client.post(
+            app.url_path_for("books:burrow-book", id=available_book.id)
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()["returning_date"] is None
+
+        res = await client.post(
+            app.url_path_for("books:burrow-book", id=available_book.id)
+        )
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+
+        res = await client.post(
+            app.url_path_for("books:return-book", id=available_book.id)
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()["returning_date"] is not None
+
+        res = await client.post(
+            app.url_path_for("books:return-book", id=available_book.id)
+        )
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_concurrent_burrows_only_one_succeeds(
+        self, app: FastAPI, client: AsyncClient, available_book: BookResponse
+    ) -> None:
+        responses = await asyncio.gather(
+            *(
+                client.post(app.url_path_for("books:burrow-book", id=available_book.id))
+                for _ in range(5)
+            )
+        )
+        status_codes = sorted(res.status_code for res in responses)
+        assert status_codes == [200, 403, 403, 403, 403]
+
+    @pytest.mark.parametrize("route", ("books:burrow-book", "books:return-book"))
+    async def test_wrong_id_return_error(
+        self, app: FastAPI, client: AsyncClient, route: str
+    ) -> None:
+        res = await client.post(app.url_path_for(route, id=50000))
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestSearchBooks:
+    async def test_search_books(self, app: FastAPI, client: AsyncClient) -> None:
+        books = [
+            {
+                "title": "searchable dragon tales",
+                "authors": ["Search Author"],
+                "categories": ["Search Fiction"],
+            },
+            {
+                "title": "another book",
+                "description": "a story about a dragon",
+                "authors": ["Search Author"],
+                "categories": ["Search Poetry"],
+            },
+        ]
+        await client.post(app.url_path_for("books:create-books"), json=books)
+
+        res = await client.get(
+            app.url_path_for("books:search-books"),
+            params={"q": "dragon", "authors": "Search Author"},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        body = res.json()
+        assert body["total"] == 2
+        # Title matches are weighted above description matches.
+        assert body["books"][0]["title"] == "searchable dragon tales"
+        assert {"value": "Search Author", "count": 2} in body["facets"]["authors"]
+
+        res = await client.get(
+            app.url_path_for("books:search-books"),
+            params={"q": "dragon", "categories": "Search Poetry"},
+        )
+        assert [book["title"] for book in res.json()["books"]] == ["another book"]
+
+        res = await client.get(
+            app.url_path_for("books:search-books"),
+            params={"q": "dragon", "authors": "Search Author", "offset": 10},
+        )
+        assert res.json()["books"] == []
+        assert res.json()["total"] == 2
+
+    async def test_search_without_matches(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.get(
+            app.url_path_for("books:search-books"), params={"q": "nomatchword"}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()["total"] == 0
+
+
+class TestExportBooks:
+    async def test_export_books(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("books:export-books"))
+        assert res.status_code == status.HTTP_200_OK
+        assert res.headers["content-type"].startswith("application/x-ndjson")
+        books = [BookResponse.parse_raw(line) for line in res.text.splitlines()]
+        assert [book.id for book in books] == sorted(book.id for book in books)
+
+        res = await client.get(
+            app.url_path_for("books:export-books"), params={"after_id": books[4].id}
+        )
+        resumed = [BookResponse.parse_raw(line) for line in res.text.splitlines()]
+        assert resumed == books[5:]
+
+
+class TestUpdateBookVersion:
+    async def test_update_only_provided_fields(
+        self, app: FastAPI, client: AsyncClient, available_book: BookResponse
+    ) -> None:
+        res = await client.patch(
+            app.url_path_for("books:update-book", id=available_book.id),
+            json={"update_data": {"page_count": 42}},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        updated_book = BookResponse(**res.json())
+        assert updated_book.page_count == 42
+        assert updated_book.title == available_book.title
+        assert updated_book.version == available_book.version + 1
+        assert res.headers["ETag"] == f'"{updated_book.version}"'
+
+    async def test_if_match(
+        self, app: FastAPI, client: AsyncClient, available_book: BookResponse
+    ) -> None:
+        url = app.url_path_for("books:update-book", id=available_book.id)
+        etag = f'"{available_book.version}"'
+        res = await client.patch(
+            url, json={"update_data": {"title": "first"}}, headers={"If-Match": etag}
+        )
+        assert res.status_code == status.HTTP_200_OK
+
+        res = await client.patch(
+            url, json={"update_data": {"title": "second"}}, headers={"If-Match": etag}
+        )
+        assert res.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+        res = await client.patch(
+            url,
+            json={"update_data": {"title": "second"}},
+            headers={"If-Match": f'"{available_book.version + 1}"'},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()["title"] == "second"
+
+
+class TestConditionalGet:
+    async def test_book_not_modified(
+        self, app: FastAPI, client: AsyncClient, available_book: BookResponse
+    ) -> None:
+        url = app.url_path_for("books:get-book-by-id", id=available_book.id)
+        res = await client.get(url)
+        etag = res.headers["ETag"]
+        assert etag == f'"{available_book.version}"'
+
+        res = await client.get(url, headers={"If-None-Match": etag})
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+        assert res.headers["ETag"] == etag
+        assert res.content == b""
+
+        await client.patch(
+            app.url_path_for("books:update-book", id=available_book.id),
+            json={"update_data": {"page_count": 7}},
+        )
+        res = await client.get(url, headers={"If-None-Match": etag})
+        assert res.status_code == status.HTTP_200_OK
+        assert res.headers["ETag"] != etag
+
+    async def test_book_list_not_modified(
+        self, app: FastAPI, client: AsyncClient, available_book: BookResponse
+    ) -> None:
+        url = app.url_path_for("books:get-books")
+        res = await client.get(url, params={"limit": 100})
+        etag = res.headers["ETag"]
+
+        res = await client.get(
+            url, params={"limit": 100}, headers={"If-None-Match": f"W/{etag}"}
+        )
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+
+        await client.patch(
+            app.url_path_for("books:update-book", id=available_book.id),
+            json={"update_data": {"page_count": 7}},
+        )
+        res = await client.get(
+            url, params={"limit": 100}, headers={"If-None-Match": etag}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.headers["ETag"] != etag
+
+
+class TestBurrowBooks:
+    async def test_burrow_and_return_books(
+        self, app: FastAPI, client: AsyncClient, db: Database
+    ) -> None:
+        book_repo = BookRepository(db)
+        book_ids = [
+            (await book_repo.create_book(new_book=BookCreate(title="checkout"))).id
+            for _ in range(3)
+        ]
+
+        res = await client.post(
+            app.url_path_for("books:burrow-books"),
+            json={"book_ids": [*book_ids, 50000, book_ids[0]]},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        checkout = BookLoanResponse(**res.json())
+        assert (checkout.succeeded, checkout.failed) == (3, 2)
+        assert [result.error for result in checkout.results] == [
+            None,
+            None,
+            None,
+            "No book found with that id.",
+            "Cannot burrow this book.",
+        ]
+        assert all(result.history for result in checkout.results[:3])
+
+        res = await client.post(
+            app.url_path_for("books:return-books"), json={"book_ids": book_ids}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        returned = BookLoanResponse(**res.json())
+        assert returned.succeeded == 3
+        assert all(result.history.returning_date for result in returned.results)
+
+        res = await client.post(
+            app.url_path_for("books:return-books"), json={"book_ids": book_ids}
+        )
+        assert BookLoanResponse(**res.json()).failed == 3
+
+    async def test_too_many_books_raise_error(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.post(
+            app.url_path_for("books:burrow-books"),
+            json={"book_ids": list(range(1, 1002))},
+        )
+        assert res.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class TestBookAvailability:
+    async def test_get_availability(
+        self, app: FastAPI, client: AsyncClient, db: Database
+    ) -> None:
+        book_repo = BookRepository(db)
+        borrowed, available = [
+            (await book_repo.create_book(new_book=BookCreate(title="shelf"))).id
+            for _ in range(2)
+        ]
+        await client.post(app.url_path_for("books:burrow-book", id=borrowed))
+
+        res = await client.get(
+            app.url_path_for("books:get-availability"),
+            params={"ids": [available, 50000, borrowed, available]},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert [BookAvailability(**book) for book in res.json()] == [
+            BookAvailability(book_id=available, available=True),
+            BookAvailability(book_id=borrowed, available=False),
+        ]
+
+        res = await client.get(
+            app.url_path_for("books:get-books"),
+            params={
+                "limit": 100,
+                "after": encode_cursor(id=borrowed - 1),
+                "available": False,
+                "fields": "title,available",
+            },
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()[0] == {
+            "id": borrowed,
+            "title": "shelf",
+            "version": 1,
+            "available": False,
+        }
+        assert available not in [book["id"] for book in res.json()]
+        assert "X-Total-Count" not in res.headers
+
+    async def test_too_many_ids_raise_error(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.get(
+            app.url_path_for("books:get-availability"),
+            params={"ids": list(range(1, 1002))},
+        )
+        assert res.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,52 @@
+import pytest
+from app.db.cache import CacheBackend, LRUCache
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestLRUCache:
+    async def test_backends_must_implement_the_interface(self) -> None:
+        class GetOnlyCache(CacheBackend):
+            async def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            GetOnlyCache()
+
+    async def test_get_and_set(self) -> None:
+        cache = LRUCache(max_size=2, ttl=60)
+        assert await cache.get("a") is None
+        await cache.set("a", 1)
+        assert await cache.get("a") == 1
+        assert cache.stats.dict() == {"hits": 1, "misses": 1, "evictions": 0}
+
+    async def test_least_recently_used_is_evicted(self) -> None:
+        cache = LRUCache(max_size=2, ttl=60)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+        assert await cache.get("b") is None
+        assert await cache.get("a") == 1
+        assert cache.stats.evictions == 1
+
+    async def test_entry_ttl_overrides_default(self) -> None:
+        cache = LRUCache(max_size=2, ttl=60)
+        await cache.set("a", 1, ttl=0)
+        await cache.set("b", 2)
+        assert await cache.get("a") is None
+        assert await cache.get("b") == 2
+
+    async def test_expired_entry_is_evicted(self) -> None:
+        cache = LRUCache(max_size=2, ttl=0)
+        await cache.set("a", 1)
+        assert await cache.get("a") is None
+        assert cache.stats.evictions == 1
+        assert len(cache) == 0
+
+    async def test_delete(self) -> None:
+        cache = LRUCache(max_size=2, ttl=60)
+        await cache.set("a", 1)
+        await cache.delete("a")
+        await cache.delete("missing")
+        assert await cache.get("a") is None
@@ -0,0 +1,68 @@
+import asyncio
+from typing import List, Optional
+
+import pytest
+from app.core.metrics import REPOSITORY_COALESCED_CALLS
+from app.db.coalescing import SingleFlight, coalesce
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeRepository:
+    def __init__(self, single_flight: Optional[SingleFlight]) -> None:
+        self.single_flight = single_flight
+        self.read_db = object()
+        self.calls: List[int] = []
+
+    @coalesce
+    async def get_book_by_id(self, *, id: int) -> int:
+        self.calls.append(id)
+        await asyncio.sleep(0.01)
+        return id
+
+    @coalesce
+    async def get_books(self, *, ids: List[int]) -> List[int]:
+        self.calls.extend(ids)
+        await asyncio.sleep(0.01)
+        return ids
+
+
+def coalesced_calls(method: str) -> float:
+    return REPOSITORY_COALESCED_CALLS.labels(method)._value.get()
+
+
+class TestSingleFlight:
+    async def test_concurrent_identical_calls_share_one_call(self) -> None:
+        method = "FakeRepository.get_book_by_id"
+        repo = FakeRepository(SingleFlight(methods=[method]))
+        before = coalesced_calls(method)
+
+        results = await asyncio.gather(
+            *(repo.get_book_by_id(id=1) for _ in range(5)),
+            repo.get_book_by_id(id=2),
+        )
+        assert results == [1, 1, 1, 1, 1, 2]
+        assert repo.calls == [1, 2]
+        assert coalesced_calls(method) - before == 4
+
+        await repo.get_book_by_id(id=1)
+        assert repo.calls == [1, 2, 1]
+
+    async def test_unconfigured_methods_are_not_coalesced(self) -> None:
+        repo = FakeRepository(SingleFlight(methods=["FakeRepository.get_book_by_id"]))
+        await asyncio.gather(*(repo.get_books(ids=[1, 2]) for _ in range(2)))
+        assert repo.calls == [1, 2, 1, 2]
+
+        repo = FakeRepository(None)
+        await asyncio.gather(*(repo.get_book_by_id(id=1) for _ in range(2)))
+        assert repo.calls == [1, 1]
+
+    async def test_cancelled_caller_does_not_cancel_shared_call(self) -> None:
+        repo = FakeRepository(SingleFlight(methods=["FakeRepository.get_book_by_id"]))
+        first = asyncio.ensure_future(repo.get_book_by_id(id=1))
+        second = asyncio.ensure_future(repo.get_book_by_id(id=1))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == 1
+        assert first.cancelled()
+        assert repo.calls == [1]
@@ -0,0 +1,136 @@
+import asyncio
+
+import asyncpg
+import pytest
+from app.db.repositories.books import BookRepository
+from app.db.repositories.events import EventRepository
+from app.models.book import BookCreate, BookResponse
+from app.models.event import BookEventPage
+from databases import Database
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette import status
+
+pytestmark = pytest.mark.asyncio
+
+GET_LAST_SEQ_QUERY = "SELECT coalesce(max(seq), 0) FROM book_events;"
+
+
+async def get_last_seq(db: Database) -> int:
+    await db.execute("SELECT sequence_book_events();")
+    return await db.fetch_val(GET_LAST_SEQ_QUERY)
+
+
+class TestBookEvents:
+    async def test_mutations_append_events(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        db: Database,
+        available_book: BookResponse,
+    ) -> None:
+        last_seq = await get_last_seq(db)
+        book_id = available_book.id
+        await client.post(app.url_path_for("books:burrow-book", id=book_id))
+        await client.post(app.url_path_for("books:return-book", id=book_id))
+        await client.patch(
+            app.url_path_for("books:update-book", id=book_id),
+            json={"update_data": {"title": "evented book"}},
+        )
+        # Books with loans cannot be deleted, so delete one without any.
+        deleted = await BookRepository(db).create_book(
+            new_book=BookCreate(title="deleted book")
+        )
+        res = await client.delete(app.url_path_for("books:delete-book", id=deleted.id))
+        assert res.status_code == status.HTTP_200_OK
+
+        res = await client.get(
+            app.url_path_for("events:get-events"),
+            params={"after": last_seq, "wait": 0},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        page = BookEventPage(**res.json())
+        assert [(event.book_id, event.type) for event in page.events] == [
+            (book_id, "borrowed"),
+            (book_id, "returned"),
+            (book_id, "updated"),
+            (deleted.id, "created"),
+            (deleted.id, "deleted"),
+        ]
+        assert page.events[2].version == 2
+        assert page.last_seq == page.events[-1].seq
+
+    async def test_events_wait_for_older_transactions(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        db: Database,
+        available_book: BookResponse,
+    ) -> None:
+        last_seq = await get_last_seq(db)
+        url = app.url_path_for("events:get-events")
+        connection = await asyncpg.connect(str(db.url))
+        try:
+            transaction = connection.transaction()
+            await transaction.start()
+            await connection.execute(
+                "UPDATE books SET page_count = 1 WHERE id = $1", available_book.id
+            )
+            # Commits after the open transaction started, so it is held back.
+            await client.post(
+                app.url_path_for("books:burrow-book", id=available_book.id)
+            )
+            res = await client.get(url, params={"after": last_seq, "wait": 0})
+            assert res.json()["events"] == []
+
+            await transaction.commit()
+        finally:
+            await connection.close()
+
+        res = await client.get(url, params={"after": last_seq, "wait": 0})
+        page = BookEventPage(**res.json())
+        assert [event.type for event in page.events] == ["updated", "borrowed"]
+
+    async def test_long_poll_returns_when_an_event_commits(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        db: Database,
+        available_book: BookResponse,
+    ) -> None:
+        last_seq = await get_last_seq(db)
+        poll = asyncio.ensure_future(
+            client.get(
+                app.url_path_for("events:get-events"),
+                params={"after": last_seq, "wait": 10},
+            )
+        )
+        await asyncio.sleep(0.1)
+        assert not poll.done()
+        await client.post(app.url_path_for("books:burrow-book", id=available_book.id))
+
+        res = await asyncio.wait_for(poll, 10)
+        assert res.status_code == status.HTTP_200_OK
+        page = BookEventPage(**res.json())
+        assert [(event.book_id, event.type) for event in page.events] == [
+            (available_book.id, "borrowed")
+        ]
+
+    async def test_compacted_events_are_gone(
+        self, app: FastAPI, client: AsyncClient, db: Database
+    ) -> None:
+        last_seq = await get_last_seq(db)
+        assert await EventRepository(db).compact_events(retention_seconds=0) > 0
+
+        res = await client.get(
+            app.url_path_for("events:get-events"), params={"after": 0, "wait": 0}
+        )
+        assert res.status_code == status.HTTP_410_GONE
+        assert res.headers["X-Compacted-Seq"] == str(last_seq)
+
+        res = await client.get(
+            app.url_path_for("events:get-events"),
+            params={"after": last_seq, "wait": 0},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()["events"] == []
@@ -0,0 +1,138 @@
+import datetime
+import json
+from typing import Callable, Iterator
+
+import pytest
+from app.db.repositories.histories import (
+    BORROW_BOOK_QUERY,
+    GET_BOOK_HISTORIES_QUERY,
+    GET_BOOKS_AVAILABILITY_QUERY,
+)
+from app.models.book import BookResponse
+from app.models.history import HistoryInDB
+from databases import Database
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette import status
+
+pytestmark = pytest.mark.asyncio
+
+
+def iter_plan_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from iter_plan_nodes(child)
+
+
+class TestHistoriesQueryPlans:
+    @pytest.mark.parametrize(
+        "query, values, index_name",
+        (
+            (
+                GET_BOOK_HISTORIES_QUERY,
+                lambda book_id: {"book_id": book_id, "limit": 10},
+                "ix_histories_book_id_borrowing_date",
+            ),
+            (
+                BORROW_BOOK_QUERY,
+                lambda book_id: {
+                    "book_id": book_id,
+                    "borrowing_date": datetime.datetime(2022, 1, 1),
+                },
+                "ix_histories_open_loan",
+            ),
+            (
+                GET_BOOKS_AVAILABILITY_QUERY,
+                lambda book_id: {"book_ids": [book_id]},
+                "ix_histories_open_loan",
+            ),
+        ),
+    )
+    async def test_queries_use_index_only_scan(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        db: Database,
+        available_book: BookResponse,
+        query: str,
+        values: Callable[[int], dict],
+        index_name: str,
+    ) -> None:
+        for route in ("books:burrow-book", "books:return-book"):
+            await client.post(app.url_path_for(route, id=available_book.id))
+        await db.execute("VACUUM ANALYZE histories")
+
+        async with db.transaction(force_rollback=True):
+            # Test tables are tiny, so make the planner ignore cheaper plans.
+            await db.execute("SET LOCAL enable_seqscan = off")
+            await db.execute("SET LOCAL enable_bitmapscan = off")
+            plan = await db.fetch_val(
+                query=f"EXPLAIN (FORMAT JSON) {query.format(conditions='')}",
+                values=values(available_book.id),
+            )
+
+        nodes = list(iter_plan_nodes(json.loads(plan)[0]["Plan"]))
+        assert any(
+            node["Node Type"] == "Index Only Scan" and node["Index Name"] == index_name
+            for node in nodes
+        )
+
+
+class TestExportHistories:
+    async def test_export_histories(
+        self, app: FastAPI, client: AsyncClient, available_book: BookResponse
+    ) -> None:
+        for route in ("books:burrow-book", "books:return-book"):
+            await client.post(app.url_path_for(route, id=available_book.id))
+
+        res = await client.get(app.url_path_for("histories:export-histories"))
+        assert res.status_code == status.HTTP_200_OK
+        histories = [HistoryInDB.parse_raw(line) for line in res.text.splitlines()]
+        assert histories[-1].book_id == available_book.id
+        assert histories[-1].returning_date is not None
+
+        res = await client.get(
+            app.url_path_for("histories:export-histories"),
+            params={"after_id": histories[-1].id},
+        )
+        assert res.text == ""
+
+
+class TestBurrowHistory:
+    async def test_burrow_history_pages(
+        self, app: FastAPI, client: AsyncClient, available_book: BookResponse
+    ) -> None:
+        for _ in range(3):
+            for route in ("books:burrow-book", "books:return-book"):
+                await client.post(app.url_path_for(route, id=available_book.id))
+        url = app.url_path_for("books:burrow-history", id=available_book.id)
+
+        res = await client.get(url, params={"limit": 2})
+        assert res.status_code == status.HTTP_200_OK
+        first_page = res.json()
+        assert len(first_page) == 2
+
+        res = await client.get(
+            url, params={"limit": 2, "after": res.headers["X-Next-Cursor"]}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        second_page = res.json()
+        assert len(second_page) == 1
+        assert "X-Next-Cursor" not in res.headers
+        assert second_page[0]["borrowing_date"] < first_page[-1]["borrowing_date"]
+
+        # An exactly full last page has no next cursor.
+        res = await client.get(url, params={"limit": 3})
+        assert len(res.json()) == 3
+        assert "X-Next-Cursor" not in res.headers
+
+        res = await client.get(url, params={"borrowed_from": "2100-01-01T00:00:00"})
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_invalid_cursor_raise_error(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.get(
+            app.url_path_for("books:burrow-history", id=1), params={"after": "bad"}
+        )
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,21 @@
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette import status
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestMetrics:
+    async def test_metrics_expose_query_and_route_latency(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        await client.get(app.url_path_for("books:get-book-by-id", id=1))
+
+        res = await client.get(app.url_path_for("metrics:get-metrics"))
+        assert res.status_code == status.HTTP_200_OK
+        query_count = 'db_query_duration_seconds_count{query="GET_BOOK_BY_ID_QUERY"}'
+        assert query_count in res.text
+        assert 'route="/api/books/{id}"' in res.text
+        assert "db_pool_wait_seconds_count" in res.text
+        assert "book_cache_misses_total" in res.text
@@ -0,0 +1,35 @@
+import pytest
+from app.db.prepared import PreparedQuery
+from app.db.repositories.books import GET_BOOK_BY_ID_QUERY
+from app.models.book import BookResponse
+from databases import Database
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestPreparedQuery:
+    def test_named_parameters_become_positional(self) -> None:
+        query = PreparedQuery(
+            "SELECT :b, CAST(:a AS text[]), x::int FROM t WHERE id = :b AND t = '1'"
+        )
+        assert query.sql == (
+            "SELECT $1, CAST($2 AS text[]), x::int FROM t WHERE id = $1 AND t = '1'"
+        )
+        assert query.parameters == ("b", "a")
+        assert query.arguments({"a": 1, "b": 2}) == [2, 1]
+        assert query == str(query)
+
+    async def test_prepared_and_plain_paths_return_same_row(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        db: Database,
+        available_book: BookResponse,
+    ) -> None:
+        values = {"id": available_book.id}
+        prepared = await db.fetch_one(GET_BOOK_BY_ID_QUERY, values)
+        plain = await db.fetch_one(str(GET_BOOK_BY_ID_QUERY), values)
+        assert dict(prepared) == dict(plain)
+        assert BookResponse.construct(**prepared) == available_book
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+from app.api import middleware
+from app.api.responses import ModelJSONResponse, sse_message
+from app.models.book import BookResponse
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette import status
+from starlette.responses import PlainTextResponse
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestModelJSONResponse:
+    async def test_renders_models_like_pydantic(self) -> None:
+        book = BookResponse(id=1, title="book", authors=["author"], version=1)
+        response = ModelJSONResponse([book])
+        assert json.loads(response.body) == [json.loads(book.json())]
+
+
+class TestEventStream:
+    async def test_sse_message(self) -> None:
+        book = BookResponse(id=1, title="book", authors=["author"], version=1)
+        message = sse_message(book, id=7, event="created")
+        lines = message.decode().split("\n")
+        assert lines[:2] == ["id: 7", "event: created"]
+        assert json.loads(lines[2][len("data: ") :]) == json.loads(book.json())
+        assert message.endswith(b"\n\n")
+
+
+class TestCompression:
+    async def test_large_responses_are_compressed(self, app: FastAPI) -> None:
+        async with AsyncClient(app=app, base_url="http://testserver") as client:
+            res = await client.get(app.openapi_url, headers={"Accept-Encoding": "gzip"})
+        assert res.status_code == status.HTTP_200_OK
+        assert res.headers["Content-Encoding"] == "gzip"
+        assert res.json()["info"]["title"] == app.title
+
+    async def test_event_streams_are_not_compressed(self, app: FastAPI) -> None:
+        async with AsyncClient(app=app, base_url="http://testserver") as client:
+            res = await client.get(
+                app.openapi_url,
+                headers={"Accept": "text/event-stream", "Accept-Encoding": "gzip"},
+            )
+        assert res.status_code == status.HTTP_200_OK
+        assert "Content-Encoding" not in res.headers
+
+    async def test_brotli_compression(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(middleware, "COMPRESSION", "brotli")
+        app = FastAPI()
+        app.get("/large")(lambda: PlainTextResponse("x" * 10000))
+        middleware.add_compression_middleware(app)
+        async with AsyncClient(app=app, base_url="http://testserver") as client:
+            res = await client.get("/large", headers={"Accept-Encoding": "br"})
+        assert res.status_code == status.HTTP_200_OK
+        assert res.headers["Content-Encoding"] == "br"
+        assert res.text == "x" * 10000
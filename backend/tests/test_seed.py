@@ -0,0 +1,16 @@
+import json
+import pathlib
+
+from app.db.seed import DEFAULT_FIXTURE, read_fixture
+
+
+class TestReadFixture:
+    def test_read_ndjson_fixture(self) -> None:
+        books = list(read_fixture(DEFAULT_FIXTURE))
+        assert len(books) == 10
+        assert all(book.title for book in books)
+
+    def test_read_json_array(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "books.json"
+        path.write_text(json.dumps([{"title": "first"}, {"title": "second"}]))
+        assert [book.title for book in read_fixture(path)] == ["first", "second"]
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from app.db.slow_queries import SlowQueryLog
+from databases import Database
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette import status
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def slow_query_log() -> SlowQueryLog:
+    return SlowQueryLog(
+        threshold=0.1, sample_rate=0, explains_per_minute=1, max_entries=2
+    )
+
+
+class TestSlowQueryLog:
+    async def test_record_keeps_latest_entries(
+        self, slow_query_log: SlowQueryLog
+    ) -> None:
+        for name in ("FIRST_QUERY", "SECOND_QUERY", "THIRD_QUERY"):
+            slow_query_log.record(
+                None,
+                query_name=name,
+                caller="BookRepository.get_books",
+                query="SELECT 1",
+                values={"limit": 10, "after_id": None},
+                duration=0.25,
+            )
+        entries = slow_query_log.entries
+        assert [entry.query_name for entry in entries] == [
+            "THIRD_QUERY",
+            "SECOND_QUERY",
+        ]
+        assert entries[0].params == {"limit": "int", "after_id": "NoneType"}
+        assert entries[0].duration_ms == 250
+        assert entries[0].plan is None
+
+    async def test_explains_are_rate_limited(
+        self, slow_query_log: SlowQueryLog
+    ) -> None:
+        slow_query_log.sample_rate = 1
+        assert slow_query_log._should_explain()
+        assert not slow_query_log._should_explain()
+
+    async def test_slow_query_route_is_disabled_by_default(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.get(app.url_path_for("admin:get-slow-queries"))
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_explain_runs_outside_the_callers_transaction(
+        self, slow_query_log: SlowQueryLog, client: AsyncClient, db: Database
+    ) -> None:
+        slow_query_log.sample_rate = 1
+        async with db.transaction():
+            # Only the caller's connection would cancel the EXPLAIN ANALYZE.
+            await db.execute("SET LOCAL statement_timeout = 1")
+            slow_query_log.record(
+                db,
+                query_name="GET_BOOKS_QUERY",
+                caller="BookRepository.get_books",
+                query="SELECT pg_sleep(0.01), count(*) FROM books",
+                values=None,
+                duration=0.25,
+            )
+            await asyncio.gather(*slow_query_log._tasks)
+        assert slow_query_log.entries[0].plan is not None
+
+    async def test_analyzed_queries_are_rolled_back(
+        self, slow_query_log: SlowQueryLog, client: AsyncClient, db: Database
+    ) -> None:
+        slow_query_log.sample_rate = 1
+        event_id = await db.fetch_val(
+            "INSERT INTO book_events (book_id, type) VALUES (1, 'updated') RETURNING id"
+        )
+        slow_query_log.record(
+            db,
+            query_name="SEQUENCE_BOOK_EVENTS_QUERY",
+            caller="EventRepository.get_events",
+            query="SELECT sequence_book_events();",
+            values=None,
+            duration=0.25,
+        )
+        await asyncio.gather(*slow_query_log._tasks)
+        seq = await db.fetch_val(
+            "SELECT seq FROM book_events WHERE id = :id", values={"id": event_id}
+        )
+        await db.execute(
+            "DELETE FROM book_events WHERE id = :id", values={"id": event_id}
+        )
+        assert slow_query_log.entries[0].plan is not None
+        assert seq is None